@@ -8,6 +8,7 @@ import logging
 import asyncio
 import sqlite3
 import re
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
 from functools import wraps
@@ -28,25 +29,27 @@ from telegram.ext import (
     ContextTypes,
     filters
 )
-from telegram.error import TelegramError
+from telegram.error import TelegramError, BadRequest, Forbidden, RetryAfter, TimedOut
 
+from bot_client import install_uvloop
 from config import Config
 from database import (
     init_db,
     get_or_create_tenant,
+    get_cached_tenant_config,
+    invalidate_tenant_config,
     update_tenant_config,
     add_warning,
     get_warnings,
+    get_warning_reasons,
     remove_warning,
     reset_warnings,
     add_filter_word,
     remove_filter_word,
     get_filter_words,
     log_action,
-    get_tenant_stats,
     is_global_admin,
     log_member_activity,
-    get_member_activity_stats,
     get_user_language,
     set_user_language,
     get_all_tenants,
@@ -54,9 +57,20 @@ from database import (
     update_chat_admin,
     remove_chat_admin,
     get_user_admin_chats,
-    refresh_chat_admins
+    refresh_chat_admins,
+    start_write_queue,
+    stop_write_queue,
+    optimize_db,
+    run_db_write,
+    aget_or_create_tenant,
+    aget_tenant_stats,
+    aget_member_activity_stats,
+    aadd_warning,
+    areset_warnings,
+    aupdate_tenant_config,
+    update_chat_admins
 )
-from translations import get_text, LANGUAGE_NAMES
+from translations import get_text, get_texts, LANGUAGE_NAMES
 
 # Configure logging
 logging.basicConfig(
@@ -65,6 +79,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-message settings bound once at import (Config is validated on import)
+FLOOD_LIMIT = Config.FLOOD_LIMIT
+FLOOD_TIME = Config.FLOOD_TIME
+VERIFICATION_TIMEOUT = Config.VERIFICATION_TIMEOUT
+
 # In-memory storage for rate limiting (per tenant)
 tenant_flood_tracking: Dict[int, Dict[int, List[float]]] = {}
 tenant_pending_verifications: Dict[int, Dict[int, int]] = {}
@@ -74,19 +93,28 @@ tenant_pending_verifications: Dict[int, Dict[int, int]] = {}
 admin_cache: Dict[tuple, tuple] = {}
 ADMIN_CACHE_TTL = 60  # seconds
 
-# Tenant configuration cache: {chat_id: (TenantConfig, timestamp)}
-# Cache tenant configs for 5 minutes to reduce database queries
-tenant_cache: Dict[int, Tuple] = {}
-TENANT_CACHE_TTL = 300  # 5 minutes
-
-# Filter words cache: {chat_id: (List[str], timestamp)}
-# Cache filter words for 10 minutes
-filter_words_cache: Dict[int, Tuple[List[str], float]] = {}
+# Filter words cache: {chat_id: (words, compiled pattern or None, timestamp)}
+# Cache filter words (and their combined regex) for 10 minutes
+filter_words_cache: Dict[int, Tuple[List[str], Optional[re.Pattern], float]] = {}
 FILTER_CACHE_TTL = 600  # 10 minutes
 
+# Resolved language cache: {chat_id: (language, monotonic timestamp)}
+# Avoids a database round trip per error reply in the same chat
+_LANG_CACHE: Dict[int, Tuple[str, float]] = {}
+LANG_CACHE_TTL = 60  # seconds
+
 # Compiled regex pattern for URL detection (compile once, reuse everywhere)
 URL_PATTERN = re.compile(r'(?:http[s]?://|www\.|t\.me/)[^\s]+', re.IGNORECASE)
 
+# Media messages moderated by the antimedia toggles (built once, shared by handlers)
+MEDIA_FILTER = (
+    filters.PHOTO | filters.VIDEO | filters.AUDIO | filters.VOICE |
+    filters.Sticker.ALL | filters.ANIMATION | filters.VIDEO_NOTE
+)
+
+# Message entity types treated as links by antilink
+LINK_ENTITY_TYPES = frozenset({'url', 'text_link', 'mention', 'text_mention'})
+
 # ==================== DECORATORS ====================
 
 def rate_limit(seconds: int = 2):
@@ -147,36 +175,70 @@ def group_only(func):
 # ==================== HELPER FUNCTIONS ====================
 
 def get_cached_tenant(chat_id: int, chat_title: str = "", chat_type: str = "group"):
-    """Get tenant config with caching to reduce database queries"""
-    now = datetime.now().timestamp()
-    
-    if chat_id in tenant_cache:
-        config, cached_time = tenant_cache[chat_id]
-        if now - cached_time < TENANT_CACHE_TTL:
-            return config
-    
-    # Cache miss or expired - query database
-    config = get_or_create_tenant(chat_id, chat_title, chat_type)
-    tenant_cache[chat_id] = (config, now)
+    """Get tenant config (cached in-process by the database layer)"""
+    return get_or_create_tenant(chat_id, chat_title, chat_type)
+
+async def get_cached_tenant_async(chat_id: int, chat_title: str = "", chat_type: str = "group"):
+    """Like get_cached_tenant, but loads cache misses off the event loop"""
+    config = get_cached_tenant_config(chat_id)
+    if config is None:
+        config = await aget_or_create_tenant(chat_id, chat_title, chat_type)
     return config
 
+def get_group_title(chat_id: int) -> str:
+    """Get a group's stored title (kept current from new_chat_title service messages)"""
+    return get_cached_tenant(chat_id).chat_title or "Unknown Group"
+
+def _resolve_lang(update: Update) -> str:
+    """Resolve reply language for an update (group language or user preference), cached for 60s"""
+    chat = update.effective_chat
+    now = time.monotonic()
+
+    cached = _LANG_CACHE.get(chat.id)
+    if cached and now - cached[1] < LANG_CACHE_TTL:
+        return cached[0]
+
+    if chat.type in ['group', 'supergroup']:
+        lang = get_or_create_tenant(chat.id).language
+    else:
+        lang = get_user_language(update.effective_user.id)
+
+    _LANG_CACHE[chat.id] = (lang, now)
+    return lang
+
+def invalidate_lang_cache(chat_id: int):
+    """Drop a cached language after the group or user changes it"""
+    _LANG_CACHE.pop(chat_id, None)
+
 def invalidate_tenant_cache(chat_id: int):
     """Invalidate tenant cache when config changes"""
-    tenant_cache.pop(chat_id, None)
+    invalidate_tenant_config(chat_id)
 
-def get_cached_filter_words(chat_id: int) -> List[str]:
-    """Get filter words with caching to reduce database queries"""
+def _load_filter_cache(chat_id: int) -> Tuple[Tuple[str, ...], Optional[re.Pattern], float]:
+    """Return cached (words, pattern, timestamp) for a chat, reloading when expired"""
     now = datetime.now().timestamp()
-    
+
     if chat_id in filter_words_cache:
-        words, cached_time = filter_words_cache[chat_id]
-        if now - cached_time < FILTER_CACHE_TTL:
-            return words
-    
-    # Cache miss or expired - query database
+        entry = filter_words_cache[chat_id]
+        if now - entry[2] < FILTER_CACHE_TTL:
+            return entry
+
+    # Cache miss or expired - query database and compile one alternation for all words
+    # Longest words first so the reported match is the most specific one
     words = get_filter_words(chat_id)
-    filter_words_cache[chat_id] = (words, now)
-    return words
+    alternatives = sorted({w for w in words if w}, key=len, reverse=True)
+    pattern = re.compile('|'.join(map(re.escape, alternatives)), re.IGNORECASE) if alternatives else None
+    entry = (words, pattern, now)
+    filter_words_cache[chat_id] = entry
+    return entry
+
+def get_cached_filter_words(chat_id: int) -> Tuple[str, ...]:
+    """Get filter words with caching to reduce database queries"""
+    return _load_filter_cache(chat_id)[0]
+
+def get_cached_filter_pattern(chat_id: int) -> Optional[re.Pattern]:
+    """Get a case-insensitive regex matching any filter word (None if no words)"""
+    return _load_filter_cache(chat_id)[1]
 
 def invalidate_filter_cache(chat_id: int):
     """Invalidate filter cache when words are added/removed"""
@@ -194,6 +256,21 @@ def invalidate_admin_cache(chat_id: int, user_id: int = None):
         for key in keys_to_remove:
             admin_cache.pop(key, None)
 
+async def kick_member(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int, chat_type: str = None):
+    """Remove a member from the chat but allow them to rejoin"""
+    if chat_type is None:
+        chat_type = (await get_cached_tenant_async(chat_id)).chat_type
+
+    if chat_type == 'group':
+        # unbanChatMember only works in supergroups and channels, so basic groups need ban + unban
+        await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
+        await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_id, only_if_banned=True)
+        return
+
+    # Without only_if_banned, unbanChatMember removes a current member and leaves
+    # them free to rejoin - a kick in one API call instead of ban + unban
+    await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
+
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int = None) -> bool:
     """Check if user is admin in the group (with 60s cache)"""
     if user_id is None:
@@ -238,12 +315,8 @@ async def show_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE,
     """Show settings menu for a specific group (can be called from private chat)"""
     tenant = get_or_create_tenant(chat_id)
 
-    # Get chat info
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        chat_title = chat.title
-    except TelegramError:
-        chat_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    chat_title = get_group_title(chat_id)
 
     lang = tenant.language
 
@@ -688,8 +761,7 @@ async def kick_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_to_kick.id)
-        await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_to_kick.id)
+        await kick_member(context, chat_id, user_to_kick.id, update.effective_chat.type)
 
         # Log the action
         log_action(chat_id, user_to_kick.id, admin_id, "KICK", "Kicked from group")
@@ -814,9 +886,8 @@ async def warn_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if warnings >= tenant.max_warnings:
         try:
-            # Kick user (ban then immediately unban - allows rejoin with invite link)
-            await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_to_warn.id)
-            await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_to_warn.id)
+            # Kick user (allows rejoin with invite link)
+            await kick_member(context, chat_id, user_to_warn.id, update.effective_chat.type)
             log_action(chat_id, user_to_warn.id, admin_id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings")
 
             await update.message.reply_text(
@@ -881,11 +952,17 @@ async def check_warnings(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
 
     warnings = get_warnings(chat_id, user.id)
+    text = get_text(lang, 'warnings_info', user=user.mention_html(), warnings=warnings, max_warnings=tenant.max_warnings)
 
-    await update.message.reply_text(
-        get_text(lang, 'warnings_info', user=user.mention_html(), warnings=warnings, max_warnings=tenant.max_warnings),
-        parse_mode='HTML'
-    )
+    # List the reason behind each warning (stored as UTC timestamps)
+    reasons = get_warning_reasons(chat_id, user.id) if warnings else []
+    if reasons:
+        import html
+        text += f"\n\n<b>{get_text(lang, 'warning_reasons')}:</b>"
+        for ts, reason in reasons:
+            text += f"\n• {html.escape(reason)} <i>({ts[:16]} UTC)</i>"
+
+    await update.message.reply_text(text, parse_mode='HTML')
 
 @rate_limit(3)
 async def add_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1092,6 +1169,7 @@ async def filter_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         if add_filter_word(chat_id, word, admin_id):
+            invalidate_filter_cache(chat_id)
             await query.edit_message_text(get_text(lang, 'filter_added', word=word), parse_mode='Markdown')
         else:
             await query.edit_message_text(get_text(lang, 'filter_exists', word=word), parse_mode='Markdown')
@@ -1117,6 +1195,7 @@ async def filter_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         if remove_filter_word(chat_id, word):
+            invalidate_filter_cache(chat_id)
             await query.edit_message_text(get_text(lang, 'filter_removed', word=word), parse_mode='Markdown')
         else:
             await query.edit_message_text(get_text(lang, 'filter_not_found', word=word), parse_mode='Markdown')
@@ -1236,9 +1315,9 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
+        admin_rows = []
         for group_chat_id, group_title in all_groups:
             try:
                 chat_member = await context.bot.get_chat_member(
@@ -1247,12 +1326,14 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 if chat_member.status in ['creator', 'administrator']:
                     managed_groups.append((group_chat_id, group_title))
-                    # Update cache
-                    update_chat_admin(group_chat_id, user_id, chat_member.status)
+                    admin_rows.append((group_chat_id, user_id, chat_member.status))
             except TelegramError:
                 # Bot might have been removed from group or can't check permissions
                 continue
 
+        # Update cache (persisted in one batch)
+        update_chat_admins(admin_rows)
+
     if not managed_groups:
         await update.message.reply_text(
             get_text(lang, 'no_admin_groups')
@@ -1508,6 +1589,7 @@ async def start_language_callback(update: Update, context: ContextTypes.DEFAULT_
 
         # Save user's language preference for private chat
         set_user_language(query.from_user.id, new_lang)
+        invalidate_lang_cache(query.from_user.id)
 
         user_name = query.from_user.first_name
 
@@ -1581,7 +1663,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1634,7 +1715,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1687,7 +1767,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1740,7 +1819,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1793,7 +1871,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1846,7 +1923,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1899,7 +1975,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -1952,7 +2027,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -2005,7 +2079,6 @@ async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
         for group_chat_id, group_title in all_groups:
@@ -2157,9 +2230,9 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cursor = conn.cursor()
         cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
         all_groups = cursor.fetchall()
-        conn.close()
 
         # Check which groups the user is admin in
+        admin_rows = []
         for group_chat_id, group_title in all_groups:
             try:
                 chat_member = await context.bot.get_chat_member(
@@ -2168,11 +2241,13 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 if chat_member.status in ['creator', 'administrator']:
                     managed_groups.append((group_chat_id, group_title))
-                    # Update cache
-                    update_chat_admin(group_chat_id, user_id, chat_member.status)
+                    admin_rows.append((group_chat_id, user_id, chat_member.status))
             except TelegramError:
                 continue
 
+        # Update cache (persisted in one batch)
+        update_chat_admins(admin_rows)
+
     if not managed_groups:
         await update.message.reply_text(
             get_text(lang, 'no_admin_groups_add')
@@ -2184,8 +2259,9 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id, chat_title = managed_groups[0]
         tenant = get_or_create_tenant(chat_id)
         lang = tenant.language
-        stats = get_tenant_stats(chat_id)
-        member_stats = get_member_activity_stats(chat_id)
+        stats, member_stats = await asyncio.gather(
+            aget_tenant_stats(chat_id), aget_member_activity_stats(chat_id)
+        )
         pending = len(tenant_pending_verifications.get(chat_id, {}))
 
         # Calculate growth indicators
@@ -2262,18 +2338,15 @@ async def stats_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer(get_text(lang, 'permission_error'), show_alert=True)
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        chat_title = chat.title
-    except TelegramError:
-        chat_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    chat_title = get_group_title(chat_id)
 
     # Get stats
     tenant = get_or_create_tenant(chat_id)
     lang = tenant.language
-    stats = get_tenant_stats(chat_id)
-    member_stats = get_member_activity_stats(chat_id)
+    stats, member_stats = await asyncio.gather(
+        aget_tenant_stats(chat_id), aget_member_activity_stats(chat_id)
+    )
     pending = len(tenant_pending_verifications.get(chat_id, {}))
 
     # Calculate growth indicators
@@ -2473,7 +2546,6 @@ async def set_rules(update: Update, context: ContextTypes.DEFAULT_TYPE):
     cursor = conn.cursor()
     cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
     all_groups = cursor.fetchall()
-    conn.close()
 
     # Check which groups the user is admin in
     managed_groups = []
@@ -2574,7 +2646,6 @@ async def see_rules(update: Update, context: ContextTypes.DEFAULT_TYPE):
     cursor = conn.cursor()
     cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
     all_groups = cursor.fetchall()
-    conn.close()
 
     # Check which groups the user is admin in
     managed_groups = []
@@ -2630,7 +2701,6 @@ async def set_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
     cursor = conn.cursor()
     cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
     all_groups = cursor.fetchall()
-    conn.close()
 
     # Check which groups the user is admin in
     managed_groups = []
@@ -2729,12 +2799,8 @@ async def setwelcome_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.edit_message_text("❌ Error: Welcome message not found. Please try again.")
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Update the welcome message
     update_tenant_config(chat_id, welcome_message=welcome_text)
@@ -2955,12 +3021,8 @@ async def start_setrules_callback(update: Update, context: ContextTypes.DEFAULT_
         await query.answer(get_text(lang, 'permission_error'), show_alert=True)
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Store the target chat_id in user data and set waiting state
     context.user_data['waiting_for_rules'] = chat_id
@@ -3002,12 +3064,8 @@ async def setrules_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("❌ Error: Rules text not found. Please try again.")
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Update the rules
     update_tenant_config(chat_id, rules_text=rules_text)
@@ -3047,12 +3105,8 @@ async def seewelcome_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     tenant = get_or_create_tenant(chat_id)
     lang = tenant.language
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Show current welcome message
     text = f"{get_text(lang, 'viewwelcome_title')}\n\n{get_text(lang, 'viewwelcome_current', group_title=group_title, welcome_message=tenant.welcome_message)}"
@@ -3086,12 +3140,8 @@ async def start_setwelcome_callback(update: Update, context: ContextTypes.DEFAUL
         await query.answer(get_text(lang, 'permission_error'), show_alert=True)
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Store the target chat_id in user data and set waiting state
     context.user_data['waiting_for_welcome'] = chat_id
@@ -3134,12 +3184,8 @@ async def viewwelcome_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     tenant = get_or_create_tenant(chat_id)
     lang = tenant.language
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Check if welcome message is set
     if not tenant.welcome_message:
@@ -3189,12 +3235,8 @@ async def viewrules_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     tenant = get_or_create_tenant(chat_id)
     lang = tenant.language
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Show custom rules or default rules
     if tenant.rules_text:
@@ -3241,12 +3283,8 @@ async def seerules_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tenant = get_or_create_tenant(chat_id)
     lang = tenant.language
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Show custom rules or default rules
     if tenant.rules_text:
@@ -3281,12 +3319,8 @@ async def start_setfilter_callback(update: Update, context: ContextTypes.DEFAULT
         await query.answer(get_text(lang, 'permission_error'), show_alert=True)
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Store the target chat_id in user data and set waiting state
     context.user_data['waiting_for_filter'] = chat_id
@@ -3322,12 +3356,8 @@ async def start_removefilter_callback(update: Update, context: ContextTypes.DEFA
         await query.answer(get_text(lang, 'permission_error'), show_alert=True)
         return
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Store the target chat_id in user data and set waiting state
     context.user_data['waiting_for_unfilter'] = chat_id
@@ -3367,12 +3397,8 @@ async def viewfilters_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     tenant = get_or_create_tenant(chat_id)
     lang = tenant.language
 
-    # Get group title
-    try:
-        chat = await context.bot.get_chat(chat_id)
-        group_title = chat.title
-    except TelegramError:
-        group_title = "Unknown Group"
+    # Get group title (cached with the tenant, no API call)
+    group_title = get_group_title(chat_id)
 
     # Get filtered words
     filtered_words = get_filter_words(chat_id)
@@ -3436,7 +3462,6 @@ async def view_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
     cursor = conn.cursor()
     cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE chat_type IN ('group', 'supergroup')")
     all_groups = cursor.fetchall()
-    conn.close()
 
     # Check which groups the user is admin in
     managed_groups = []
@@ -3486,108 +3511,104 @@ async def view_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def filter_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Filter messages for banned words, spam, links, and files"""
-    if not update.message:
+    msg = update.message
+    if not msg:
         return
 
     # Only work in groups
-    if update.effective_chat.type not in ['group', 'supergroup']:
+    chat = update.effective_chat
+    if chat.type not in ['group', 'supergroup']:
         return
 
     # Skip channel-forwarded messages in discussion groups
     # These are automatic forwards from linked channels - should not be moderated
     # BUT: User comments in discussion groups SHOULD be moderated
-    if update.message.forward_origin and hasattr(update.message.forward_origin, 'type'):
+    if msg.forward_origin and hasattr(msg.forward_origin, 'type'):
         from telegram.constants import MessageOriginType
-        if update.message.forward_origin.type == MessageOriginType.CHANNEL:
-            logger.info(f"Skipping channel-forwarded message in {update.effective_chat.title}")
+        if msg.forward_origin.type == MessageOriginType.CHANNEL:
+            logger.info(f"Skipping channel-forwarded message in {chat.title}")
             return
 
+    # Nothing to do in groups with every filter switched off
+    chat_id = chat.id
+    tenant = await get_cached_tenant_async(chat_id, chat.title, chat.type)
+    if not tenant.any_filter_enabled:
+        return
+
     # Don't filter admins
     # Note: When forwarding messages with hidden sender, effective_user.id = 777000 (Telegram Service)
     # We need to skip these because they're forwarded by admins
-    if await is_admin(update, context) or update.effective_user.id == 777000:
-        logger.info(f"Skipping admin message from user {update.effective_user.id} in {update.effective_chat.title}")
+    user = update.effective_user
+    uid = user.id
+    if await is_admin(update, context) or uid == 777000:
+        logger.info(f"Skipping admin message from user {uid} in {chat.title}")
         return
 
-    chat_id = update.effective_chat.id
-    tenant = get_cached_tenant(chat_id, update.effective_chat.title, update.effective_chat.type)
+    texts = get_texts(tenant.language)
+    mention = user.mention_html()
 
     # Check antiflood
     if tenant.antiflood_enabled:
-        if is_flooding(chat_id, update.effective_user.id, Config.FLOOD_LIMIT, Config.FLOOD_TIME):
+        if is_flooding(chat_id, uid, FLOOD_LIMIT, FLOOD_TIME):
             try:
-                await update.message.delete()
+                await msg.delete()
                 await context.bot.restrict_chat_member(
                     chat_id=chat_id,
-                    user_id=update.effective_user.id,
+                    user_id=uid,
                     permissions=ChatPermissions(can_send_messages=False),
                     until_date=datetime.now(timezone.utc) + timedelta(minutes=5)
                 )
 
-                log_action(chat_id, update.effective_user.id, context.bot.id, "AUTO-MUTE", "Flooding detected", 5)
+                log_action(chat_id, uid, context.bot.id, "AUTO-MUTE", "Flooding detected", 5)
 
-                msg = await context.bot.send_message(
+                notice = await context.bot.send_message(
                     chat_id=chat_id,
-                    text=get_text(tenant.language, 'flood_muted', user=update.effective_user.mention_html()),
+                    text=texts['flood_muted'].format(user=mention),
                     parse_mode='HTML'
                 )
                 await asyncio.sleep(5)
-                await msg.delete()
+                await notice.delete()
                 return
             except TelegramError as e:
                 logger.error(f"Error handling flood: {e}")
 
     # Check link filtering (before word filters)
-    if tenant.antilink_enabled and (update.message.text or update.message.caption):
-        # Check if message contains URLs/links
-        has_link = False
-
-        # Check for URL entities in text (links, mentions, hashtags, etc.)
-        if update.message.entities:
-            for entity in update.message.entities:
-                if entity.type in ['url', 'text_link', 'mention', 'text_mention']:
-                    has_link = True
-                    break
-
-        # Check for URL entities in caption
-        if not has_link and update.message.caption_entities:
-            for entity in update.message.caption_entities:
-                if entity.type in ['url', 'text_link', 'mention', 'text_mention']:
-                    has_link = True
-                    break
-
-        # Also check for common URL patterns in text or caption
+    if tenant.antilink_enabled and (msg.text or msg.caption):
+        # Check for link entities in text or caption (links, mentions)
+        has_link = (
+            any(entity.type in LINK_ENTITY_TYPES for entity in msg.entities)
+            or any(entity.type in LINK_ENTITY_TYPES for entity in msg.caption_entities)
+        )
+
+        # Only fall back to the regex when entities didn't already decide
         if not has_link:
-            text_to_check = update.message.text or update.message.caption or ""
-            if URL_PATTERN.search(text_to_check):
-                has_link = True
+            has_link = URL_PATTERN.search(msg.text or msg.caption or "") is not None
 
         if has_link:
             try:
                 # Delete the message with link
-                await update.message.delete()
+                await msg.delete()
 
                 # Add warning to user
-                warnings = add_warning(chat_id, update.effective_user.id, "Havolalar taqiqlangan")
+                warnings = await aadd_warning(chat_id, uid, "Havolalar taqiqlangan")
 
                 # Check if user reached max warnings
                 if warnings >= tenant.max_warnings:
-                    # Auto-kick user (ban then unban - allows rejoin)
-                    await context.bot.ban_chat_member(chat_id=chat_id, user_id=update.effective_user.id)
-                    await context.bot.unban_chat_member(chat_id=chat_id, user_id=update.effective_user.id)
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings (antilink)")
+                    # Auto-kick user (allows rejoin)
+                    await kick_member(context, chat_id, uid, chat.type)
+                    log_action(chat_id, uid, context.bot.id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings (antilink)")
 
-                    msg = await context.bot.send_message(
+                    notice = await context.bot.send_message(
                         chat_id=chat_id,
-                        text=get_text(tenant.language, 'user_warned_banned', user=update.effective_user.mention_html(), max_warnings=tenant.max_warnings),
+                        text=texts['user_warned_banned'].format(user=mention, max_warnings=tenant.max_warnings),
                         parse_mode='HTML'
                     )
-                    reset_warnings(chat_id, update.effective_user.id)
+                    await areset_warnings(chat_id, uid)
                 else:
                     # Just warn the user
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "WARN", "Link detected (antilink)")
+                    log_action(chat_id, uid, context.bot.id, "WARN", "Link detected (antilink)")
 
-                    warning_text = get_text(tenant.language, 'link_warning', user=update.effective_user.mention_html(), warnings=warnings, max_warnings=tenant.max_warnings)
+                    warning_text = texts['link_warning'].format(user=mention, warnings=warnings, max_warnings=tenant.max_warnings)
                     logger.info(f"Sending warning - Text length: {len(warning_text)}, First 100 chars: {warning_text[:100]}")
 
                     warning_msg = await context.bot.send_message(
@@ -3595,15 +3616,15 @@ async def filter_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         text=warning_text,
                         parse_mode='HTML'
                     )
-                    logger.info(f"Sent link warning to user {update.effective_user.id} in {update.effective_chat.title} - msg_id: {warning_msg.message_id}")
+                    logger.info(f"Sent link warning to user {uid} in {chat.title} - msg_id: {warning_msg.message_id}")
                 return
             except TelegramError as e:
                 logger.error(f"Error handling link message: {e}")
 
     # Check file filtering (only documents, not media)
-    if tenant.antifile_enabled and update.message.document:
+    if tenant.antifile_enabled and msg.document:
         # Get file extension
-        file_name = update.message.document.file_name or ""
+        file_name = msg.document.file_name or ""
         file_ext = file_name.lower().split('.')[-1] if '.' in file_name else ""
 
         # Dangerous file extensions to block
@@ -3621,31 +3642,30 @@ async def filter_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if file_ext in dangerous_extensions:
             try:
                 # Delete the message with file
-                await update.message.delete()
+                await msg.delete()
 
                 # Add warning to user
-                warnings = add_warning(chat_id, update.effective_user.id, "Fayllar taqiqlangan")
+                warnings = await aadd_warning(chat_id, uid, "Fayllar taqiqlangan")
 
                 # Check if user reached max warnings
                 if warnings >= tenant.max_warnings:
-                    # Auto-kick user (ban then unban - allows rejoin)
-                    await context.bot.ban_chat_member(chat_id=chat_id, user_id=update.effective_user.id)
-                    await context.bot.unban_chat_member(chat_id=chat_id, user_id=update.effective_user.id)
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings (antifile)")
+                    # Auto-kick user (allows rejoin)
+                    await kick_member(context, chat_id, uid, chat.type)
+                    log_action(chat_id, uid, context.bot.id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings (antifile)")
 
-                    msg = await context.bot.send_message(
+                    notice = await context.bot.send_message(
                         chat_id=chat_id,
-                        text=get_text(tenant.language, 'user_warned_banned', user=update.effective_user.mention_html(), max_warnings=tenant.max_warnings),
+                        text=texts['user_warned_banned'].format(user=mention, max_warnings=tenant.max_warnings),
                         parse_mode='HTML'
                     )
-                    reset_warnings(chat_id, update.effective_user.id)
+                    await areset_warnings(chat_id, uid)
                 else:
                     # Just warn the user
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "WARN", "File detected (antifile)")
+                    log_action(chat_id, uid, context.bot.id, "WARN", "File detected (antifile)")
 
                     await context.bot.send_message(
                         chat_id=chat_id,
-                        text=get_text(tenant.language, 'file_warning', user=update.effective_user.mention_html(), warnings=warnings, max_warnings=tenant.max_warnings),
+                        text=texts['file_warning'].format(user=mention, warnings=warnings, max_warnings=tenant.max_warnings),
                         parse_mode='HTML'
                     )
                 return
@@ -3654,47 +3674,46 @@ async def filter_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Check media filtering (photos, videos, audio, voice, stickers, animations, video notes)
     media_checks = [
-        (update.message.photo, tenant.antimedia_photo, 'media_photo'),
-        (update.message.video, tenant.antimedia_video, 'media_video'),
-        (update.message.audio, tenant.antimedia_audio, 'media_audio'),
-        (update.message.voice, tenant.antimedia_voice, 'media_voice'),
-        (update.message.sticker, tenant.antimedia_sticker, 'media_sticker'),
-        (update.message.animation, tenant.antimedia_animation, 'media_animation'),
-        (update.message.video_note, tenant.antimedia_videonote, 'media_videonote'),
+        (msg.photo, tenant.antimedia_photo, 'media_photo'),
+        (msg.video, tenant.antimedia_video, 'media_video'),
+        (msg.audio, tenant.antimedia_audio, 'media_audio'),
+        (msg.voice, tenant.antimedia_voice, 'media_voice'),
+        (msg.sticker, tenant.antimedia_sticker, 'media_sticker'),
+        (msg.animation, tenant.antimedia_animation, 'media_animation'),
+        (msg.video_note, tenant.antimedia_videonote, 'media_videonote'),
     ]
 
     for media_present, filter_enabled, media_type_key in media_checks:
         if media_present and filter_enabled:
             try:
                 # Delete the message with media
-                await update.message.delete()
+                await msg.delete()
 
                 # Get the media type name for display (simple form for warnings)
-                media_type_name = get_text(tenant.language, f"{media_type_key}_name")
+                media_type_name = texts[f"{media_type_key}_name"]
 
                 # Add warning to user
-                warnings = add_warning(chat_id, update.effective_user.id, f"{media_type_name} taqiqlangan")
+                warnings = await aadd_warning(chat_id, uid, f"{media_type_name} taqiqlangan")
 
                 # Check if user reached max warnings
                 if warnings >= tenant.max_warnings:
-                    # Auto-kick user (ban then unban - allows rejoin)
-                    await context.bot.ban_chat_member(chat_id=chat_id, user_id=update.effective_user.id)
-                    await context.bot.unban_chat_member(chat_id=chat_id, user_id=update.effective_user.id)
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings (media: {media_type_key})")
+                    # Auto-kick user (allows rejoin)
+                    await kick_member(context, chat_id, uid, chat.type)
+                    log_action(chat_id, uid, context.bot.id, "AUTO-KICK", f"Reached {tenant.max_warnings} warnings (media: {media_type_key})")
 
-                    msg = await context.bot.send_message(
+                    notice = await context.bot.send_message(
                         chat_id=chat_id,
-                        text=get_text(tenant.language, 'user_warned_banned', user=update.effective_user.mention_html(), max_warnings=tenant.max_warnings),
+                        text=texts['user_warned_banned'].format(user=mention, max_warnings=tenant.max_warnings),
                         parse_mode='HTML'
                     )
-                    reset_warnings(chat_id, update.effective_user.id)
+                    await areset_warnings(chat_id, uid)
                 else:
                     # Just warn the user
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "WARN", f"Media detected: {media_type_key}")
+                    log_action(chat_id, uid, context.bot.id, "WARN", f"Media detected: {media_type_key}")
 
                     await context.bot.send_message(
                         chat_id=chat_id,
-                        text=get_text(tenant.language, 'media_warning', user=update.effective_user.mention_html(), warnings=warnings, max_warnings=tenant.max_warnings, media_type=media_type_name),
+                        text=texts['media_warning'].format(user=mention, warnings=warnings, max_warnings=tenant.max_warnings, media_type=media_type_name),
                         parse_mode='HTML'
                     )
                 return
@@ -3702,28 +3721,28 @@ async def filter_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 logger.error(f"Error handling media message ({media_type_key}): {e}")
 
     # Check word filters (for text messages and captions)
-    if tenant.filter_enabled and (update.message.text or update.message.caption):
-        # Check both text and caption
-        message_text = (update.message.text or update.message.caption or "").lower()
-        filters = get_cached_filter_words(chat_id)
+    if tenant.filter_enabled and (msg.text or msg.caption):
+        # Check both text and caption (pattern is case-insensitive, no need to lowercase)
+        message_text = msg.text or msg.caption or ""
+        pattern = get_cached_filter_pattern(chat_id)
+        match = pattern.search(message_text) if pattern else None
 
-        for word in filters:
-            if word in message_text:
-                try:
-                    await update.message.delete()
+        if match:
+            try:
+                await msg.delete()
 
-                    log_action(chat_id, update.effective_user.id, context.bot.id, "FILTER", f"Filtered word: {word}")
+                log_action(chat_id, uid, context.bot.id, "FILTER", f"Filtered word: {match.group(0).lower()}")
 
-                    msg = await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=get_text(tenant.language, 'word_filtered', user=update.effective_user.mention_html()),
-                        parse_mode='HTML'
-                    )
-                    await asyncio.sleep(3)
-                    await msg.delete()
-                    return
-                except TelegramError as e:
-                    logger.error(f"Error deleting message: {e}")
+                notice = await context.bot.send_message(
+                    chat_id=chat_id,
+                    text=texts['word_filtered'].format(user=mention),
+                    parse_mode='HTML'
+                )
+                await asyncio.sleep(3)
+                await notice.delete()
+                return
+            except TelegramError as e:
+                logger.error(f"Error deleting message: {e}")
 
 # ==================== SERVICE MESSAGE HANDLING ====================
 
@@ -3763,7 +3782,12 @@ async def handle_service_messages(update: Update, context: ContextTypes.DEFAULT_
         return
 
     chat_id = update.effective_chat.id
-    tenant = get_cached_tenant(chat_id, update.effective_chat.title, update.effective_chat.type)
+    tenant = await get_cached_tenant_async(chat_id, update.effective_chat.title, update.effective_chat.type)
+
+    # Keep the stored title current so menus don't need get_chat for it
+    if update.message.new_chat_title:
+        await aupdate_tenant_config(chat_id, chat_title=update.message.new_chat_title)
+        invalidate_tenant_cache(chat_id)
 
     try:
         # Handle user joined messages
@@ -3803,7 +3827,7 @@ async def handle_service_messages(update: Update, context: ContextTypes.DEFAULT_
 async def new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle new members joining"""
     chat_id = update.effective_chat.id
-    tenant = get_or_create_tenant(chat_id, update.effective_chat.title, update.effective_chat.type)
+    tenant = await aget_or_create_tenant(chat_id, update.effective_chat.title, update.effective_chat.type)
 
     # Log member activity for all new members
     for member in update.message.new_chat_members:
@@ -3891,7 +3915,7 @@ async def new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Schedule auto-kick after 2 minutes
             context.job_queue.run_once(
                 auto_kick_unverified,
-                when=Config.VERIFICATION_TIMEOUT,
+                when=VERIFICATION_TIMEOUT,
                 data={'chat_id': chat_id, 'user_id': member.id}
             )
 
@@ -3915,7 +3939,7 @@ async def verify_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     chat_id = query.message.chat_id
-    tenant = get_or_create_tenant(chat_id)
+    tenant = await aget_or_create_tenant(chat_id)
 
     try:
         # Unmute user
@@ -3985,8 +4009,7 @@ async def auto_kick_unverified(context: ContextTypes.DEFAULT_TYPE):
 
     if chat_id in tenant_pending_verifications and user_id in tenant_pending_verifications[chat_id]:
         try:
-            await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
-            await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
+            await kick_member(context, chat_id, user_id)
 
             msg_data = tenant_pending_verifications[chat_id][user_id]
 
@@ -4008,130 +4031,174 @@ async def auto_kick_unverified(context: ContextTypes.DEFAULT_TYPE):
 
 # ==================== ERROR HANDLER ====================
 
+# Known Telegram errors, checked in priority order:
+# (error class, substrings of the error text (empty = any), log level,
+#  log message (%-style, may use %(error)s), reply translation key or None)
+TELEGRAM_ERROR_RULES = (
+    (Forbidden, (), logging.WARNING, "Bot doesn't have permissions or was blocked", None),
+    # Timeouts are usually temporary network issues - don't reply
+    (TimedOut, (), logging.WARNING, "Request timed out - network issue", None),
+    (RetryAfter, (), logging.WARNING, "Rate limited by Telegram", 'rate_limit_telegram'),
+    (TelegramError, ("message to delete not found",), logging.INFO, "Message already deleted", None),
+    (TelegramError, ("user not found",), logging.WARNING, "User not found in chat", 'user_not_found'),
+    (TelegramError, ("not enough rights", "CHAT_ADMIN_REQUIRED"), logging.WARNING, "Bot lacks necessary permissions", 'insufficient_permissions'),
+    # Don't reply to expired callback queries
+    (TelegramError, ("Query is too old",), logging.INFO, "Callback query expired", None),
+    (BadRequest, (), logging.WARNING, "Bad request: %(error)s", 'invalid_request'),
+)
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors gracefully"""
-    logger.error(f"Exception while handling an update: {context.error}", exc_info=context.error)
-
-    if isinstance(context.error, TelegramError):
-        error_message = str(context.error)
-
-        if "Forbidden" in error_message or "bot was blocked" in error_message:
-            logger.warning(f"Bot doesn't have permissions or was blocked")
-            return
-        elif "message to delete not found" in error_message:
-            logger.info("Message already deleted")
-            return
-        elif "user not found" in error_message:
-            logger.warning("User not found in chat")
-            if update and update.effective_message:
-                # Get language
-                if update.effective_chat.type in ['group', 'supergroup']:
-                    tenant = get_or_create_tenant(update.effective_chat.id)
-                    lang = tenant.language
-                else:
-                    lang = get_user_language(update.effective_user.id)
-                await update.effective_message.reply_text(
-                    get_text(lang, 'user_not_found')
-                )
-            return
-        elif "not enough rights" in error_message or "CHAT_ADMIN_REQUIRED" in error_message:
-            logger.warning("Bot lacks necessary permissions")
-            if update and update.effective_message:
-                # Get language
-                if update.effective_chat.type in ['group', 'supergroup']:
-                    tenant = get_or_create_tenant(update.effective_chat.id)
-                    lang = tenant.language
-                else:
-                    lang = get_user_language(update.effective_user.id)
-                await update.effective_message.reply_text(
-                    get_text(lang, 'insufficient_permissions')
-                )
-            return
-        elif "Too Many Requests" in error_message or "retry after" in error_message:
-            logger.warning("Rate limited by Telegram")
-            if update and update.effective_message:
-                # Get language
-                if update.effective_chat.type in ['group', 'supergroup']:
-                    tenant = get_or_create_tenant(update.effective_chat.id)
-                    lang = tenant.language
-                else:
-                    lang = get_user_language(update.effective_user.id)
-                await update.effective_message.reply_text(
-                    get_text(lang, 'rate_limit_telegram')
-                )
-            return
-        elif "Timed out" in error_message or "TimedOut" in str(type(context.error).__name__):
-            logger.warning(f"Request timed out - network issue")
-            # Don't send error message for timeout - it's usually temporary network issue
-            return
-        elif "Query is too old" in error_message:
-            logger.info("Callback query expired")
-            # Don't send error message for old queries
-            return
-        elif "Bad Request" in error_message:
-            logger.warning(f"Bad request: {error_message}")
-            if update and update.effective_message:
-                # Get language
-                if update.effective_chat.type in ['group', 'supergroup']:
-                    tenant = get_or_create_tenant(update.effective_chat.id)
-                    lang = tenant.language
-                else:
-                    lang = get_user_language(update.effective_user.id)
-                await update.effective_message.reply_text(
-                    get_text(lang, 'invalid_request')
-                )
-            return
+    logger.error("Exception while handling an update: %s", context.error, exc_info=context.error)
+
+    error = context.error
+    if isinstance(error, TelegramError):
+        error_message = str(error)
+
+        for error_type, needles, level, log_message, reply_key in TELEGRAM_ERROR_RULES:
+            if isinstance(error, error_type) and (not needles or any(needle in error_message for needle in needles)):
+                logger.log(level, log_message, {"error": error_message})
+                if reply_key and update and update.effective_message:
+                    lang = _resolve_lang(update)
+                    await update.effective_message.reply_text(get_text(lang, reply_key))
+                return
 
-    logger.error(f"Unhandled error: {context.error}")
+    logger.error("Unhandled error: %s", context.error)
 
     if update and update.effective_message:
         try:
-            # Get language
-            if update.effective_chat.type in ['group', 'supergroup']:
-                tenant = get_or_create_tenant(update.effective_chat.id)
-                lang = tenant.language
-            else:
-                lang = get_user_language(update.effective_user.id)
+            lang = _resolve_lang(update)
             await update.effective_message.reply_text(
                 get_text(lang, 'unexpected_error')
             )
         except Exception:
             pass
 
+# ==================== COMMAND TABLE ====================
+
+# Update types the handlers below consume; Telegram doesn't send the rest.
+# Edited messages stay in because Command/MessageHandlers also match them.
+# chat_member is never sent unless listed explicitly.
+ALLOWED_UPDATES = [
+    Update.MESSAGE,
+    Update.EDITED_MESSAGE,
+    Update.CALLBACK_QUERY,
+    Update.CHAT_MEMBER,
+]
+
+# (command, handler) pairs registered in main()
+COMMANDS = (
+    ("start", start),
+    ("help", help_command),
+    ("ban", ban_user),
+    ("unban", unban_user),
+    ("kick", kick_user),
+    ("mute", mute_user),
+    ("unmute", unmute_user),
+    ("warn", warn_user),
+    ("unwarn", unwarn_user),
+    ("warnings", check_warnings),
+    ("filter", add_filter),
+    ("unfilter", remove_filter),
+    ("seefilters", list_filters),
+    ("purge", purge_messages),
+    ("settings", settings_command),
+    ("stats", stats_command),
+    ("globalstats", globalstats_command),
+    ("info", user_info),
+    ("rules", rules_command),
+    ("setrules", set_rules),
+    ("setwelcome", set_welcome),
+    ("seewelcome", view_welcome),
+    ("seerules", see_rules),
+)
+
+# ==================== CALLBACK ROUTING ====================
+
+# callback_data prefix (up to 3 underscore-separated tokens) -> handler
+CALLBACK_ROUTES = {
+    'verify': verify_callback,
+    # Settings menu
+    'show_settings': settings_callback,
+    'toggle': settings_callback,
+    'set_warnings': settings_callback,
+    'change_warnings': settings_callback,
+    'set_welcome_duration': settings_callback,
+    'change_welcome_duration': settings_callback,
+    'settings_info': settings_callback,
+    'back_to_settings': settings_callback,
+    'back_to_start': settings_callback,
+    # Group pickers from private chat
+    'setwelcome': setwelcome_callback,
+    'setrules': setrules_callback,
+    'start_setrules': start_setrules_callback,
+    'start_setwelcome': start_setwelcome_callback,
+    'start_setfilter': start_setfilter_callback,
+    'start_removefilter': start_removefilter_callback,
+    'seewelcome': seewelcome_callback,
+    'seerules': seerules_callback,
+    'viewrules': viewrules_callback,
+    'viewwelcome': viewwelcome_callback,
+    'viewfilters': viewfilters_callback,
+    'stats': stats_callback,
+    # Help menu
+    'help': help_callback,
+    'show_help': help_callback,
+    'back_to_help': help_callback,
+    # Filter confirmation
+    'addfilter': filter_callback,
+    'removefilter': filter_callback,
+    'listfilters': filter_callback,
+}
+
+async def route_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Dispatch inline button presses to their handler by callback_data prefix"""
+    data = update.callback_query.data
+    if not data:
+        return
+
+    # Try the longest prefix first (e.g. 'set_welcome_duration' before 'set')
+    parts = data.split('_', 3)
+    for n in (3, 2, 1):
+        handler = CALLBACK_ROUTES.get('_'.join(parts[:n]))
+        if handler:
+            return await handler(update, context)
+
 # ==================== MAIN ====================
 
-def main():
-    """Start the bot"""
-    # Initialize database
-    init_db()
+DB_MAINTENANCE_INTERVAL = 15 * 60  # seconds
 
-    # Create application
-    application = Application.builder().token(Config.BOT_TOKEN).build()
+async def db_maintenance(context: ContextTypes.DEFAULT_TYPE):
+    """Periodic PRAGMA optimize + WAL checkpoint (on the writer thread, off the event loop)"""
+    try:
+        await run_db_write(optimize_db)
+    except sqlite3.Error as e:
+        logger.error(f"Database maintenance failed: {e}")
+
+async def post_init(application: Application):
+    """Start background tasks once the event loop is running"""
+    start_write_queue()
+    application.job_queue.run_repeating(
+        db_maintenance, interval=DB_MAINTENANCE_INTERVAL, first=DB_MAINTENANCE_INTERVAL
+    )
+
+async def post_shutdown(application: Application):
+    """Flush queued database writes before exiting"""
+    await stop_write_queue()
+
+def build_application() -> Application:
+    """Create the Application with every handler registered (no network or database access)"""
+    application = (
+        Application.builder()
+        .token(Config.BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Command handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("ban", ban_user))
-    application.add_handler(CommandHandler("unban", unban_user))
-    application.add_handler(CommandHandler("kick", kick_user))
-    application.add_handler(CommandHandler("mute", mute_user))
-    application.add_handler(CommandHandler("unmute", unmute_user))
-    application.add_handler(CommandHandler("warn", warn_user))
-    application.add_handler(CommandHandler("unwarn", unwarn_user))
-    application.add_handler(CommandHandler("warnings", check_warnings))
-    application.add_handler(CommandHandler("filter", add_filter))
-    application.add_handler(CommandHandler("unfilter", remove_filter))
-    application.add_handler(CommandHandler("seefilters", list_filters))
-    application.add_handler(CommandHandler("purge", purge_messages))
-    application.add_handler(CommandHandler("settings", settings_command))
-    application.add_handler(CommandHandler("stats", stats_command))
-    application.add_handler(CommandHandler("globalstats", globalstats_command))
-    application.add_handler(CommandHandler("info", user_info))
-    application.add_handler(CommandHandler("rules", rules_command))
-    application.add_handler(CommandHandler("setrules", set_rules))
-    application.add_handler(CommandHandler("setwelcome", set_welcome))
-    application.add_handler(CommandHandler("seewelcome", view_welcome))
-    application.add_handler(CommandHandler("seerules", see_rules))
+    for command, callback in COMMANDS:
+        application.add_handler(CommandHandler(command, callback))
 
     # Private text message handler (for conversation states) - MUST be before filter_messages
     application.add_handler(MessageHandler(
@@ -4139,15 +4206,16 @@ def main():
         handle_private_text
     ))
 
-    # Message filters
+    # Message filters (text)
     application.add_handler(MessageHandler(
-        (filters.TEXT | filters.Document.ALL) & ~filters.COMMAND,
+        filters.TEXT & ~filters.COMMAND,
         filter_messages
     ))
 
-    # Media message handler (photos, videos, audio, voice, stickers, animations, video notes)
+    # Attachment handler (documents, photos, videos, audio, voice, stickers, animations, video notes)
+    # Commands only live in message text, so attachments need no ~COMMAND check
     application.add_handler(MessageHandler(
-        (filters.PHOTO | filters.VIDEO | filters.AUDIO | filters.VOICE | filters.Sticker.ALL | filters.ANIMATION | filters.VIDEO_NOTE) & ~filters.COMMAND,
+        filters.Document.ALL | MEDIA_FILTER,
         filter_messages
     ))
 
@@ -4174,34 +4242,43 @@ def main():
     ))
 
     # Callback handlers
-    application.add_handler(CallbackQueryHandler(verify_callback, pattern=r'^verify_'))
-    application.add_handler(CallbackQueryHandler(settings_callback, pattern=r'^(show_settings_|toggle_|set_warnings_|change_warnings|set_welcome_duration_|change_welcome_duration|settings_info|back_to_settings|back_to_start)'))
-    application.add_handler(CallbackQueryHandler(setwelcome_callback, pattern=r'^setwelcome_'))
-    application.add_handler(CallbackQueryHandler(setrules_callback, pattern=r'^setrules_'))
-    application.add_handler(CallbackQueryHandler(start_setrules_callback, pattern=r'^start_setrules_'))
-    application.add_handler(CallbackQueryHandler(start_setwelcome_callback, pattern=r'^start_setwelcome_'))
-    application.add_handler(CallbackQueryHandler(start_setfilter_callback, pattern=r'^start_setfilter_'))
-    application.add_handler(CallbackQueryHandler(start_removefilter_callback, pattern=r'^start_removefilter_'))
-    application.add_handler(CallbackQueryHandler(seewelcome_callback, pattern=r'^seewelcome_'))
-    application.add_handler(CallbackQueryHandler(seerules_callback, pattern=r'^seerules_'))
-    application.add_handler(CallbackQueryHandler(viewrules_callback, pattern=r'^viewrules_'))
-    application.add_handler(CallbackQueryHandler(viewwelcome_callback, pattern=r'^viewwelcome_'))
-    application.add_handler(CallbackQueryHandler(viewfilters_callback, pattern=r'^viewfilters_'))
-    application.add_handler(CallbackQueryHandler(stats_callback, pattern=r'^stats_'))
-    application.add_handler(CallbackQueryHandler(help_callback, pattern=r'^(help_|show_help_|back_to_help)'))
-    application.add_handler(CallbackQueryHandler(filter_callback, pattern=r'^(addfilter_|removefilter_|listfilters_)'))
+    application.add_handler(CallbackQueryHandler(route_callback))
 
     # Error handler
     application.add_error_handler(error_handler)
 
+    return application
+
+def main():
+    """Start the bot"""
+    # Use uvloop's faster event loop when available (Linux)
+    install_uvloop()
+
+    # Initialize database
+    init_db()
+
+    # Create application
+    application = build_application()
+
     # Start the bot
     logger.info("🤖 Multi-Tenant Moderation Bot started successfully!")
-    logger.info(f"📊 Database: {Config.DATABASE_NAME}")
-    logger.info(f"🚫 Flood Limit: {Config.FLOOD_LIMIT} messages in {Config.FLOOD_TIME}s")
-    logger.info(f"✅ Verification Timeout: {Config.VERIFICATION_TIMEOUT}s")
+    logger.info("📊 Database: %s", Config.DATABASE_NAME)
+    logger.info("🚫 Flood Limit: %d messages in %ds", FLOOD_LIMIT, FLOOD_TIME)
+    logger.info("✅ Verification Timeout: %ds", VERIFICATION_TIMEOUT)
     logger.info("Press Ctrl+C to stop the bot")
 
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if Config.WEBHOOK_URL:
+        # Telegram pushes updates to us - no idle long-poll requests
+        logger.info("🌐 Webhook mode on port %d", Config.WEBHOOK_PORT)
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=Config.WEBHOOK_PORT,
+            url_path=Config.BOT_TOKEN,
+            webhook_url=f"{Config.WEBHOOK_URL}/{Config.BOT_TOKEN}",
+            allowed_updates=ALLOWED_UPDATES
+        )
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == '__main__':
     try:
@@ -4211,6 +4288,6 @@ if __name__ == '__main__':
         logger.info("Cleaning up...")
         logger.info("✅ Shutdown complete")
     except Exception as e:
-        logger.error(f"💥 Bot crashed: {e}", exc_info=True)
+        logger.error("💥 Bot crashed: %s", e, exc_info=True)
         logger.error("Please check the error above and restart the bot")
         exit(1)
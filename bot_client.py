@@ -0,0 +1,33 @@
+"""
+Shared Telegram Bot client for the maintenance scripts
+Reuses one pooled HTTP connection instead of each script building its own
+"""
+
+from functools import lru_cache
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from config import Config
+
+# Connection pool sized for the scripts' concurrent get_chat / get_chat_member calls
+CONNECTION_POOL_SIZE = 50
+
+@lru_cache(maxsize=1)
+def get_bot() -> Bot:
+    """Get the shared Bot instance (created on first use)"""
+    request = HTTPXRequest(
+        connection_pool_size=CONNECTION_POOL_SIZE,
+        connect_timeout=5.0,
+        read_timeout=20.0,
+        pool_timeout=5.0
+    )
+    return Bot(token=Config.BOT_TOKEN, request=request)
+
+def install_uvloop():
+    """Use uvloop for asyncio when it's installed (Linux); otherwise keep the default loop"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    uvloop.install()
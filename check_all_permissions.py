@@ -2,39 +2,59 @@
 """Check bot admin status in all groups"""
 
 import asyncio
-from telegram import Bot
+import sys
 from config import Config
+from bot_client import get_bot, install_uvloop
 import sqlite3
 
-async def main():
-    bot = Bot(token=Config.BOT_TOKEN)
-    await bot.initialize()
-
-    # Get all groups from database
-    conn = sqlite3.connect('multi_tenant_moderation.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT chat_id, chat_title FROM tenants WHERE is_active = 1 ORDER BY chat_title")
-    groups = cursor.fetchall()
+MAX_CONCURRENT_REQUESTS = 20
+
+def load_groups():
+    """Get all active groups from database (read-only: the audit never writes)"""
+    conn = sqlite3.connect(f"file:{Config.DATABASE_NAME}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    groups = conn.execute(
+        "SELECT chat_id, chat_title FROM tenants WHERE is_active = 1 ORDER BY chat_title"
+    ).fetchall()
     conn.close()
+    return groups
+
+async def main():
+    bot = get_bot()
+
+    # Read the database in a worker thread while the bot connects
+    groups, _ = await asyncio.gather(asyncio.to_thread(load_groups), bot.initialize())
 
     print("Checking bot permissions in all groups...\n")
 
     admin_groups = []
     member_groups = []
 
-    for chat_id, chat_title in groups:
-        try:
-            bot_member = await bot.get_chat_member(chat_id, bot.id)
-            status = bot_member.status
+    # Query all groups concurrently, capped to stay under Telegram's rate limits
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def check(chat_id, chat_title):
+        async with semaphore:
+            try:
+                bot_member = await bot.get_chat_member(chat_id, bot.id)
+                return chat_id, chat_title, bot_member.status, None
+            except Exception as e:
+                return chat_id, chat_title, None, e
+
+    results = await asyncio.gather(*(check(row['chat_id'], row['chat_title']) for row in groups))
 
-            if status in ['administrator', 'creator']:
-                admin_groups.append((chat_title, chat_id))
-                print(f"✅ ADMIN: {chat_title}")
-            else:
-                member_groups.append((chat_title, chat_id))
-                print(f"❌ MEMBER: {chat_title}")
-        except Exception as e:
-            print(f"⚠️  ERROR: {chat_title} - {str(e)[:50]}")
+    # Collect per-group lines and write them in one go
+    lines = []
+    for chat_id, chat_title, status, error in results:
+        if error is not None:
+            lines.append(f"⚠️  ERROR: {chat_title} - {str(error)[:50]}\n")
+        elif status in ['administrator', 'creator']:
+            admin_groups.append((chat_title, chat_id))
+            lines.append(f"✅ ADMIN: {chat_title}\n")
+        else:
+            member_groups.append((chat_title, chat_id))
+            lines.append(f"❌ MEMBER: {chat_title}\n")
+    sys.stdout.write("".join(lines))
 
     print(f"\n📊 Summary:")
     print(f"   Admin in: {len(admin_groups)} groups")
@@ -48,4 +68,5 @@ async def main():
     await bot.shutdown()
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
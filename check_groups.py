@@ -2,11 +2,10 @@
 """Check which groups the bot can access"""
 
 import asyncio
-from telegram import Bot
-from config import Config
+from bot_client import get_bot, install_uvloop
 
-# Group IDs from your earlier list
-GROUP_IDS = [
+# Group IDs from your earlier list (deduplicated, order preserved)
+GROUP_IDS = tuple(dict.fromkeys((
     -1003175985458,  # 💞ailem NAZARBEK FILIAL
     -1003147939740,  # 💞ailem SERGELI FILIAL
     -1002989401855,  # Penuar_Premum_N1
@@ -26,23 +25,36 @@ GROUP_IDS = [
     -1001417119670,  # 𝙋𝙊𝙎𝙏𝙀𝙇 𝙎𝙊𝙆𝙇𝘼𝘿 𝘾𝙃𝘼𝙏
     -1001279832948,  # Бепул ХИТОЙ тили
     -4759367262,     # Ali & Шерзодбек Балтабаев
-]
+)))
+
+MAX_CONCURRENT_REQUESTS = 20
 
 async def main():
-    bot = Bot(token=Config.BOT_TOKEN)
+    bot = get_bot()
 
     accessible = []
     not_accessible = []
 
     print("🔍 Checking bot access to groups...\n")
 
-    for group_id in GROUP_IDS:
-        try:
-            chat = await bot.get_chat(group_id)
+    # Query all groups concurrently, capped to stay under Telegram's rate limits
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def check(group_id):
+        async with semaphore:
+            try:
+                return group_id, await bot.get_chat(group_id), None
+            except Exception as e:
+                return group_id, None, e
+
+    results = await asyncio.gather(*(check(group_id) for group_id in GROUP_IDS))
+
+    for group_id, chat, error in results:
+        if error is None:
             print(f"✅ {chat.title} (ID: {group_id})")
             accessible.append((group_id, chat.title))
-        except Exception as e:
-            print(f"❌ ID: {group_id} - {str(e)[:50]}")
+        else:
+            print(f"❌ ID: {group_id} - {str(error)[:50]}")
             not_accessible.append(group_id)
 
     print(f"\n📊 Summary:")
@@ -53,4 +65,5 @@ async def main():
         print(f"\n⚠️  Bot needs to be re-added to {len(not_accessible)} groups")
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
@@ -2,13 +2,12 @@
 """Check bot permissions in Story Time group"""
 
 import asyncio
-from telegram import Bot
-from config import Config
+from bot_client import get_bot, install_uvloop
 
 STORY_TIME_ID = -1002601180669
 
 async def main():
-    bot = Bot(token=Config.BOT_TOKEN)
+    bot = get_bot()
 
     try:
         # Initialize bot
@@ -31,4 +30,5 @@ async def main():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 import asyncio
-from telegram import Bot
-from config import Config
+from bot_client import get_bot, install_uvloop
 
 async def main():
-    bot = Bot(token=Config.BOT_TOKEN)
+    bot = get_bot()
     await bot.initialize()
 
     chat_id = -1002914389106  # testchannel Chat
@@ -17,4 +16,5 @@ async def main():
 
     await bot.shutdown()
 
+install_uvloop()
 asyncio.run(main())
@@ -8,6 +8,10 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+def _envbool(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment (1/true/yes/on, case-insensitive)"""
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
 class Config:
     """Configuration class for the bot"""
 
@@ -20,6 +24,10 @@ class Config:
             "Get your token from @BotFather on Telegram."
         )
 
+    # Webhook mode (leave WEBHOOK_URL empty to use long polling)
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")  # public HTTPS base URL
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))  # local port to listen on
+
     # Database Configuration
     DATABASE_NAME = os.getenv("DATABASE_NAME", "multi_tenant_moderation.db")
 
@@ -30,17 +38,18 @@ class Config:
     VERIFICATION_TIMEOUT = int(os.getenv("VERIFICATION_TIMEOUT", "120"))  # seconds
 
     # Feature Flags (default enabled)
-    ENABLE_ANTIFLOOD = os.getenv("ENABLE_ANTIFLOOD", "true").lower() == "true"
-    ENABLE_WORD_FILTER = os.getenv("ENABLE_WORD_FILTER", "true").lower() == "true"
-    ENABLE_VERIFICATION = os.getenv("ENABLE_VERIFICATION", "true").lower() == "true"
-    ENABLE_WELCOME_MESSAGE = os.getenv("ENABLE_WELCOME_MESSAGE", "true").lower() == "true"
+    ENABLE_ANTIFLOOD = _envbool("ENABLE_ANTIFLOOD", True)
+    ENABLE_WORD_FILTER = _envbool("ENABLE_WORD_FILTER", True)
+    ENABLE_VERIFICATION = _envbool("ENABLE_VERIFICATION", True)
+    ENABLE_WELCOME_MESSAGE = _envbool("ENABLE_WELCOME_MESSAGE", True)
 
     # Admin Configuration
-    GLOBAL_ADMIN_IDS = []
+    # frozenset: O(1) membership checks, immutable so safe to share
+    GLOBAL_ADMIN_IDS = frozenset()
     admin_ids_str = os.getenv("GLOBAL_ADMIN_IDS", "")
     if admin_ids_str:
         try:
-            GLOBAL_ADMIN_IDS = [int(x.strip()) for x in admin_ids_str.split(",") if x.strip()]
+            GLOBAL_ADMIN_IDS = frozenset(int(x.strip()) for x in admin_ids_str.split(",") if x.strip())
         except ValueError:
             print("Warning: Invalid GLOBAL_ADMIN_IDS format. Should be comma-separated numbers.")
 
@@ -53,19 +62,25 @@ class Config:
 
     # Multi-tenant Settings
     MAX_TENANTS = int(os.getenv("MAX_TENANTS", "1000"))  # Maximum number of groups
-    AUTO_CREATE_TENANT = os.getenv("AUTO_CREATE_TENANT", "true").lower() == "true"
+    AUTO_CREATE_TENANT = _envbool("AUTO_CREATE_TENANT", True)
 
     # Language Support
     DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en")
-    SUPPORTED_LANGUAGES = ["en", "es", "fr", "de", "ru", "ar"]
+    SUPPORTED_LANGUAGES = frozenset(("uz", "en", "es", "fr", "de", "ru", "ar"))
 
     # Security Settings
-    REQUIRE_GROUP_ADMIN = os.getenv("REQUIRE_GROUP_ADMIN", "true").lower() == "true"
-    ALLOW_PRIVATE_COMMANDS = os.getenv("ALLOW_PRIVATE_COMMANDS", "false").lower() == "true"
+    REQUIRE_GROUP_ADMIN = _envbool("REQUIRE_GROUP_ADMIN", True)
+    ALLOW_PRIVATE_COMMANDS = _envbool("ALLOW_PRIVATE_COMMANDS", False)
+
+    # Set once validate() has passed, so repeated calls are no-ops
+    _VALIDATED = False
 
     @classmethod
     def validate(cls):
-        """Validate configuration"""
+        """Validate configuration (only checked once per process)"""
+        if cls._VALIDATED:
+            return True
+
         errors = []
 
         if not cls.BOT_TOKEN:
@@ -80,9 +95,14 @@ class Config:
         if cls.FLOOD_TIME < 1:
             errors.append("FLOOD_TIME must be at least 1")
 
+        if cls.DEFAULT_LANGUAGE not in cls.SUPPORTED_LANGUAGES:
+            errors.append(f"DEFAULT_LANGUAGE must be one of: {', '.join(sorted(cls.SUPPORTED_LANGUAGES))}")
+
         if errors:
-            raise ValueError(f"Configuration errors:\n" + "\n".join(errors))
+            # Deduplicate while keeping the order the checks ran in
+            raise ValueError(f"Configuration errors:\n" + "\n".join(dict.fromkeys(errors)))
 
+        cls._VALIDATED = True
         return True
 
     @classmethod
@@ -91,6 +111,7 @@ class Config:
         print("=" * 50)
         print("Multi-Tenant Moderation Bot Configuration")
         print("=" * 50)
+        print(f"Update mode: {'Webhook (' + cls.WEBHOOK_URL + ')' if cls.WEBHOOK_URL else 'Polling'}")
         print(f"Database: {cls.DATABASE_NAME}")
         print(f"Max Warnings: {cls.DEFAULT_MAX_WARNINGS}")
         print(f"Flood Limit: {cls.FLOOD_LIMIT} messages in {cls.FLOOD_TIME}s")
@@ -4,11 +4,24 @@ Handles all database operations with tenant isolation using SQLite
 """
 
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import asyncio
+import atexit
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 from config import Config
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class TenantConfig:
     """Configuration for each tenant/group"""
@@ -40,26 +53,161 @@ class TenantConfig:
     delete_join_messages: bool = True  # ON by default
     delete_leave_messages: bool = True  # ON by default
     delete_service_messages: bool = True  # ON by default
+    # Derived: False when no moderation filter is on, so messages can skip filtering entirely
+    any_filter_enabled: bool = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.any_filter_enabled = any((
+            self.antiflood_enabled, self.antilink_enabled, self.antifile_enabled, self.filter_enabled,
+            self.antimedia_photo, self.antimedia_video, self.antimedia_audio, self.antimedia_voice,
+            self.antimedia_sticker, self.antimedia_animation, self.antimedia_videonote,
+        ))
 
 # ==================== DATABASE INITIALIZATION ====================
 
+# RETURNING needs SQLite 3.35+; older libraries fall back to a follow-up SELECT
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# journal_mode=WAL persists in the database file, so it only needs setting once per process
+_wal_enabled = False
+
+# Per-connection settings (these don't persist and must be set on every connection)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL, one fsync per checkpoint instead of per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256MB memory-mapped reads
+    "PRAGMA cache_size=-20000",  # 20MB page cache
+    "PRAGMA busy_timeout=5000",  # Wait up to 5s for a writer instead of failing with "database is locked"
+    "PRAGMA analysis_limit=1000",  # ANALYZE / optimize sample ~1000 rows per index instead of full scans
+)
+
+# Per-connection prepared statement cache (the default of 128 is shared by every query in the bot)
+STATEMENT_CACHE_SIZE = 256
+
+# One connection per thread, reused for the process lifetime (no per-call open/close)
+_local = threading.local()
+_all_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(Config.DATABASE_NAME)
+    """Get this thread's database connection (opened on first use, then reused)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
+        with _connections_lock:
+            _all_connections.append(conn)
+    return conn
+
+def close_all_connections():
+    """Close every thread's connection (registered to run at exit)"""
+    with _connections_lock:
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_connections.clear()
+
+atexit.register(close_all_connections)
+
+def _open_connection():
+    """Open a new database connection (WAL mode, tuned PRAGMAs)"""
+    global _wal_enabled
+
+    # Only ever used by the thread that opened it; check_same_thread=False lets atexit close it
+    conn = sqlite3.connect(Config.DATABASE_NAME, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row  # Access columns by name
+
+    # Enable WAL mode for better concurrency (readers don't block on writers)
+    if not _wal_enabled and Config.DATABASE_NAME != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_enabled = True
+
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
     return conn
 
+# Columns added to tenants after the first release (added as BOOLEAN DEFAULT 0 when missing)
+MIGRATED_TENANT_COLUMNS = (
+    'antilink_enabled', 'antifile_enabled',
+    'antimedia_photo', 'antimedia_video', 'antimedia_audio',
+    'antimedia_voice', 'antimedia_sticker', 'antimedia_animation', 'antimedia_videonote',
+)
+
+def begin_immediate(cursor):
+    """Start a write transaction now, taking the write lock up front (no-op if one is open)"""
+    if not cursor.connection.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+
+@contextmanager
+def write_transaction():
+    """Yield a cursor inside a write transaction: commit on success, roll back on any error
+
+    Connections live for the whole process, so a failed write must never leave one
+    mid-transaction (holding the write lock and a stale read snapshot).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    begin_immediate(cursor)
+    try:
+        yield cursor
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+# Legacy warning_reasons line: "<isoformat timestamp>: <reason>" (the first reason had no timestamp)
+_LEGACY_REASON_LINE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?): (.*)$', re.DOTALL)
+
+def _legacy_timestamp_to_utc(timestamp: str) -> str:
+    """Convert a legacy datetime.now().isoformat() (server local time) to CURRENT_TIMESTAMP's UTC format"""
+    # A naive datetime is taken as local time by astimezone()
+    return datetime.fromisoformat(timestamp).astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _migrate_warning_reasons(cursor):
+    """Move reasons from the old newline-joined warning_reasons column into tenant_warning_reasons"""
+    rows = cursor.execute(
+        "SELECT tenant_id, user_id, last_warning, warning_reasons FROM tenant_warnings "
+        "WHERE warning_reasons IS NOT NULL AND warning_reasons != ''"
+    ).fetchall()
+    if not rows:
+        return
+
+    reasons = []
+    for row in rows:
+        for line in row['warning_reasons'].split("\n"):
+            match = _LEGACY_REASON_LINE.match(line)
+            if match:
+                reasons.append((row['tenant_id'], row['user_id'], match.group(2), _legacy_timestamp_to_utc(match.group(1))))
+            elif line:
+                reasons.append((row['tenant_id'], row['user_id'], line, row['last_warning']))
+
+    cursor.executemany(
+        "INSERT INTO tenant_warning_reasons (tenant_id, user_id, reason, ts) VALUES (?, ?, ?, ?)",
+        reasons
+    )
+    cursor.execute("UPDATE tenant_warnings SET warning_reasons = NULL WHERE warning_reasons IS NOT NULL")
+    print(f"✅ Migrated {len(reasons)} warning reasons to tenant_warning_reasons")
+
 def init_db():
     """Initialize multi-tenant database"""
+    # Create tables, seed admins and migrate in a single transaction (one fsync)
+    with write_transaction() as cursor:  # Connection setup applies WAL mode and PRAGMAs
+        _create_schema(cursor)
+
+    # Refresh query planner statistics so the new indexes get picked up (sampled per
+    # analysis_limit, so startup doesn't slow down as the logs grow)
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Enable WAL mode for better concurrency and performance
-    cursor.execute("PRAGMA journal_mode=WAL")
-    cursor.execute("PRAGMA synchronous=NORMAL")
-    cursor.execute("PRAGMA cache_size=10000")  # 10MB cache
-    cursor.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("ANALYZE")
+    conn.commit()
 
+    print("✅ Multi-tenant database initialized successfully!")
+
+def _create_schema(cursor):
+    """Create tables and indexes, seed global admins and run migrations"""
     # Tenants table (one row per group)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tenants (
@@ -102,12 +250,23 @@ def init_db():
             user_id INTEGER,
             warnings INTEGER DEFAULT 0,
             last_warning TIMESTAMP,
-            warning_reasons TEXT,
+            warning_reasons TEXT,  -- legacy, migrated to tenant_warning_reasons
             FOREIGN KEY (tenant_id) REFERENCES tenants (chat_id),
             UNIQUE(tenant_id, user_id)
         )
     ''')
 
+    # Warning reasons (append-only, one row per warning)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tenant_warning_reasons (
+            id INTEGER PRIMARY KEY,
+            tenant_id INTEGER,
+            user_id INTEGER,
+            reason TEXT,
+            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
     # Tenant filters (scoped by tenant_id)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tenant_filters (
@@ -180,156 +339,178 @@ def init_db():
     ''')
 
     # Add initial global admins from config
-    for admin_id in Config.GLOBAL_ADMIN_IDS:
-        cursor.execute('''
-            INSERT OR IGNORE INTO global_admins (user_id) VALUES (?)
-        ''', (admin_id,))
-
-    # Migration: Add antilink_enabled column if it doesn't exist
-    try:
-        cursor.execute("ALTER TABLE tenants ADD COLUMN antilink_enabled BOOLEAN DEFAULT 0")
-        print("✅ Added antilink_enabled column to tenants table")
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
+    cursor.executemany(
+        "INSERT OR IGNORE INTO global_admins (user_id) VALUES (?)",
+        [(admin_id,) for admin_id in Config.GLOBAL_ADMIN_IDS]
+    )
 
-    # Migration: Add antifile_enabled column if it doesn't exist
-    try:
-        cursor.execute("ALTER TABLE tenants ADD COLUMN antifile_enabled BOOLEAN DEFAULT 0")
-        print("✅ Added antifile_enabled column to tenants table")
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
-
-    # Migration: Add media filter columns if they don't exist
-    media_columns = [
-        'antimedia_photo', 'antimedia_video', 'antimedia_audio',
-        'antimedia_voice', 'antimedia_sticker', 'antimedia_animation', 'antimedia_videonote'
-    ]
-    for column in media_columns:
-        try:
+    # Migrations: add columns missing from databases created by older versions
+    existing_columns = {row['name'] for row in cursor.execute("PRAGMA table_info(tenants)")}
+    for column in MIGRATED_TENANT_COLUMNS:
+        if column not in existing_columns:
             cursor.execute(f"ALTER TABLE tenants ADD COLUMN {column} BOOLEAN DEFAULT 0")
             print(f"✅ Added {column} column to tenants table")
-        except sqlite3.OperationalError:
-            # Column already exists
-            pass
+    _load_tenant_schema(cursor)
+    _load_global_admins(cursor)
+    _load_chat_admins(cursor)
+    _migrate_warning_reasons(cursor)
 
     # Create performance indexes
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_warnings_lookup ON tenant_warnings(tenant_id, user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_warning_reasons_lookup ON tenant_warning_reasons(tenant_id, user_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_filters_lookup ON tenant_filters(tenant_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_logs_lookup ON tenant_logs(tenant_id, timestamp DESC)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_admins_lookup ON chat_admins(chat_id, user_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_member_activity_lookup ON member_activity(tenant_id, timestamp DESC)")
-    
-    conn.commit()
-    conn.close()
-    print("✅ Multi-tenant database initialized successfully!")
-
-# ==================== TENANT MANAGEMENT ====================
-
-def get_or_create_tenant(chat_id: int, chat_title: str = "", chat_type: str = "group") -> TenantConfig:
-    """Get or create tenant configuration"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM tenants WHERE chat_id = ?", (chat_id,))
-    result = cursor.fetchone()
 
-    if not result:
-        # Create new tenant
-        cursor.execute('''
-            INSERT INTO tenants
-            (chat_id, chat_title, chat_type, max_warnings)
-            VALUES (?, ?, ?, ?)
-        ''', (chat_id, chat_title, chat_type, Config.DEFAULT_MAX_WARNINGS))
-        conn.commit()
-
-        cursor.execute("SELECT * FROM tenants WHERE chat_id = ?", (chat_id,))
-        result = cursor.fetchone()
-
-    # Handle new columns that might not exist in old databases
-    try:
-        delete_join = bool(result['delete_join_messages'])
-    except (KeyError, IndexError):
-        delete_join = False
+    # Covering indexes for the per-action stats counts and the admin-chats lookup
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_logs_action ON tenant_logs(tenant_id, action, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_member_activity_action ON member_activity(tenant_id, action, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_admins_user ON chat_admins(user_id, status)")
 
-    try:
-        delete_leave = bool(result['delete_leave_messages'])
-    except (KeyError, IndexError):
-        delete_leave = False
+# ==================== TENANT MANAGEMENT ====================
 
-    try:
-        delete_service = bool(result['delete_service_messages'])
-    except (KeyError, IndexError):
-        delete_service = False
+# In-process tenant config cache: {chat_id: (TenantConfig, monotonic timestamp)}
+# Keeps the per-message tenant lookup off SQLite for warm chats
+TENANT_CACHE_TTL = 300  # 5 minutes
+_tenant_cache: Dict[int, Tuple[TenantConfig, float]] = {}
+_tenant_cache_lock = threading.RLock()
+
+def _or_default(default):
+    """Cast for nullable columns: NULL/empty becomes the default"""
+    return lambda value: value or default
+
+def _as_is(value):
+    return value
+
+# Row -> TenantConfig mapping: {field: (cast, value used when the column is missing)}
+_FIELD_MAP = {
+    'chat_id': (_as_is, None),
+    'chat_title': (_or_default(""), ""),
+    'chat_type': (_or_default("group"), "group"),
+    'welcome_enabled': (bool, False),
+    'antiflood_enabled': (bool, False),
+    'filter_enabled': (bool, False),
+    'verification_enabled': (bool, False),
+    'antilink_enabled': (bool, False),
+    'antifile_enabled': (bool, False),
+    'antimedia_photo': (bool, False),
+    'antimedia_video': (bool, False),
+    'antimedia_audio': (bool, False),
+    'antimedia_voice': (bool, False),
+    'antimedia_sticker': (bool, False),
+    'antimedia_animation': (bool, False),
+    'antimedia_videonote': (bool, False),
+    'max_warnings': (_as_is, Config.DEFAULT_MAX_WARNINGS),
+    'rules_text': (_or_default(""), ""),
+    'welcome_message': (_or_default(""), ""),
+    'welcome_message_duration': (lambda value: int(value or 0), 0),
+    'language': (_or_default("en"), "en"),
+    'timezone': (_or_default("UTC"), "UTC"),
+    'is_active': (bool, False),
+    'delete_join_messages': (bool, False),
+    'delete_leave_messages': (bool, False),
+    'delete_service_messages': (bool, False),
+}
+
+# Schema snapshot, taken once (init_db or first use) instead of probing every row
+_tenant_cols: Optional[frozenset] = None
+_tenant_fields: Tuple[tuple, ...] = ()  # (field, cast) for columns present in the table
+_tenant_defaults: Dict[str, object] = {}  # field -> default for columns missing from the table
+
+def _load_tenant_schema(cursor):
+    """Read the tenants columns once and precompute the row mapper"""
+    global _tenant_cols, _tenant_fields, _tenant_defaults
+    cols = frozenset(row['name'] for row in cursor.execute("PRAGMA table_info(tenants)"))
+    _tenant_fields = tuple((name, cast) for name, (cast, _) in _FIELD_MAP.items() if name in cols)
+    _tenant_defaults = {name: default for name, (_, default) in _FIELD_MAP.items() if name not in cols}
+    _tenant_cols = cols
+
+def _row_to_tenant(row) -> TenantConfig:
+    """Build a TenantConfig from a tenants row"""
+    if _tenant_cols is None:
+        _load_tenant_schema(get_db_connection().cursor())
+    return TenantConfig(**_tenant_defaults, **{name: cast(row[name]) for name, cast in _tenant_fields})
+
+def get_cached_tenant_config(chat_id: int) -> Optional[TenantConfig]:
+    """Return the cached tenant config if present and fresh, without touching the database"""
+    with _tenant_cache_lock:
+        entry = _tenant_cache.get(chat_id)
+        if entry and time.monotonic() - entry[1] < TENANT_CACHE_TTL:
+            return entry[0]
+    return None
+
+def invalidate_tenant_config(chat_id: int):
+    """Drop a tenant from the config cache (call after any change to its row)"""
+    with _tenant_cache_lock:
+        _tenant_cache.pop(chat_id, None)
+
+def _cache_tenant_row(row) -> TenantConfig:
+    """Build a TenantConfig from a tenants row and store it in the cache"""
+    config = _row_to_tenant(row)
+
+    with _tenant_cache_lock:
+        _tenant_cache[config.chat_id] = (config, time.monotonic())
 
-    try:
-        welcome_msg = result['welcome_message'] or ""
-    except (KeyError, IndexError):
-        welcome_msg = ""
+    return config
 
-    try:
-        welcome_duration = int(result['welcome_message_duration'] or 0)
-    except (KeyError, IndexError):
-        welcome_duration = 0
+def get_tenant(chat_id: int) -> Optional[TenantConfig]:
+    """Get an existing tenant configuration (read-only; None if the chat has no tenant yet)"""
+    config = get_cached_tenant_config(chat_id)
+    if config is not None:
+        return config
 
-    # Handle antilink_enabled (new column that might not exist)
-    try:
-        antilink = bool(result['antilink_enabled'])
-    except (KeyError, IndexError):
-        antilink = False
+    cursor = get_db_connection().cursor()
+    cursor.execute("SELECT * FROM tenants WHERE chat_id = ?", (chat_id,))
+    result = cursor.fetchone()
 
-    # Handle antifile_enabled (new column that might not exist)
-    try:
-        antifile = bool(result['antifile_enabled'])
-    except (KeyError, IndexError):
-        antifile = False
+    return _cache_tenant_row(result) if result else None
 
-    # Handle media filter columns (new columns that might not exist)
-    media_filters = {}
-    for media_type in ['photo', 'video', 'audio', 'voice', 'sticker', 'animation', 'videonote']:
-        try:
-            media_filters[f'antimedia_{media_type}'] = bool(result[f'antimedia_{media_type}'])
-        except (KeyError, IndexError):
-            media_filters[f'antimedia_{media_type}'] = False
-
-    config = TenantConfig(
-        chat_id=result['chat_id'],
-        chat_title=result['chat_title'] or "",
-        chat_type=result['chat_type'] or "group",
-        welcome_enabled=bool(result['welcome_enabled']),
-        antiflood_enabled=bool(result['antiflood_enabled']),
-        filter_enabled=bool(result['filter_enabled']),
-        verification_enabled=bool(result['verification_enabled']),
-        antilink_enabled=antilink,
-        antifile_enabled=antifile,
-        antimedia_photo=media_filters['antimedia_photo'],
-        antimedia_video=media_filters['antimedia_video'],
-        antimedia_audio=media_filters['antimedia_audio'],
-        antimedia_voice=media_filters['antimedia_voice'],
-        antimedia_sticker=media_filters['antimedia_sticker'],
-        antimedia_animation=media_filters['antimedia_animation'],
-        antimedia_videonote=media_filters['antimedia_videonote'],
-        max_warnings=result['max_warnings'],
-        rules_text=result['rules_text'] or "",
-        welcome_message=welcome_msg,
-        welcome_message_duration=welcome_duration,
-        language=result['language'] or "en",
-        timezone=result['timezone'] or "UTC",
-        is_active=bool(result['is_active']),
-        delete_join_messages=delete_join,
-        delete_leave_messages=delete_leave,
-        delete_service_messages=delete_service
-    )
+def get_or_create_tenant(chat_id: int, chat_title: str = "", chat_type: str = "group") -> TenantConfig:
+    """Get or create tenant configuration (served from the in-process cache when warm)"""
+    config = get_tenant(chat_id)
+    if config is not None:
+        return config
+
+    # Create new tenant, reading the row (with column defaults) straight back
+    insert = '''
+        INSERT INTO tenants
+        (chat_id, chat_title, chat_type, max_warnings)
+        VALUES (?, ?, ?, ?)
+    '''
+    params = (chat_id, chat_title, chat_type, Config.DEFAULT_MAX_WARNINGS)
+
+    with write_transaction() as cursor:
+        if SQLITE_HAS_RETURNING:
+            cursor.execute(insert + " RETURNING *", params)
+            result = cursor.fetchone()
+        else:
+            cursor.execute(insert, params)
+            cursor.execute("SELECT * FROM tenants WHERE chat_id = ?", (chat_id,))
+            result = cursor.fetchone()
+
+    return _cache_tenant_row(result)
+
+def bulk_upsert_tenants(rows: List[Tuple[int, str, str]]):
+    """Add or refresh many (chat_id, chat_title, chat_type) tenants in one transaction"""
+    if not rows:
+        return
+
+    with write_transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO tenants (chat_id, chat_title, chat_type, max_warnings)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                chat_title = excluded.chat_title,
+                chat_type = excluded.chat_type,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [(chat_id, title, chat_type, Config.DEFAULT_MAX_WARNINGS) for chat_id, title, chat_type in rows])
 
-    conn.close()
-    return config
+    for chat_id, _, _ in rows:
+        invalidate_tenant_config(chat_id)
 
 def update_tenant_config(chat_id: int, **kwargs):
     """Update tenant configuration"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     valid_fields = [
         'welcome_enabled', 'antiflood_enabled', 'filter_enabled',
         'verification_enabled', 'antilink_enabled', 'antifile_enabled',
@@ -340,363 +521,250 @@ def update_tenant_config(chat_id: int, **kwargs):
         'delete_join_messages', 'delete_leave_messages', 'delete_service_messages'
     ]
 
-    for key, value in kwargs.items():
-        if key in valid_fields:
-            cursor.execute(
-                f"UPDATE tenants SET {key} = ?, updated_at = CURRENT_TIMESTAMP WHERE chat_id = ?",
-                (value, chat_id)
-            )
+    # One UPDATE for all fields (column names only ever come from valid_fields)
+    cols = [key for key in kwargs if key in valid_fields]
+    if not cols:
+        return
 
-    conn.commit()
-    conn.close()
+    assignments = ", ".join(f"{col} = ?" for col in cols)
+    with write_transaction() as cursor:
+        cursor.execute(
+            f"UPDATE tenants SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE chat_id = ?",
+            [kwargs[col] for col in cols] + [chat_id]
+        )
 
-def get_all_tenants(active_only: bool = True) -> List[TenantConfig]:
-    """Get all tenant configurations"""
+    invalidate_tenant_config(chat_id)
+
+TENANT_FETCH_SIZE = 200  # rows pulled per fetchmany() call
+
+def iter_all_tenants(active_only: bool = True) -> Iterator[TenantConfig]:
+    """Stream tenant configurations one at a time instead of building a list"""
     conn = get_db_connection()
     cursor = conn.cursor()
+    cursor.arraysize = TENANT_FETCH_SIZE
 
     if active_only:
         cursor.execute("SELECT * FROM tenants WHERE is_active = 1")
     else:
         cursor.execute("SELECT * FROM tenants")
 
-    results = cursor.fetchall()
-    tenants = []
-
-    for row in results:
-        # Handle new columns that might not exist in old databases
-        try:
-            delete_join = bool(row['delete_join_messages'])
-        except (KeyError, IndexError):
-            delete_join = False
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            break
+        for row in rows:
+            yield _row_to_tenant(row)
 
-        try:
-            delete_leave = bool(row['delete_leave_messages'])
-        except (KeyError, IndexError):
-            delete_leave = False
-
-        try:
-            delete_service = bool(row['delete_service_messages'])
-        except (KeyError, IndexError):
-            delete_service = False
-
-        # Handle antilink_enabled (new column that might not exist)
-        try:
-            antilink = bool(row['antilink_enabled'])
-        except (KeyError, IndexError):
-            antilink = False
-
-        # Handle antifile_enabled (new column that might not exist)
-        try:
-            antifile = bool(row['antifile_enabled'])
-        except (KeyError, IndexError):
-            antifile = False
+def get_all_tenants(active_only: bool = True) -> List[TenantConfig]:
+    """Get all tenant configurations"""
+    return list(iter_all_tenants(active_only))
 
-        # Handle media filter columns (new columns that might not exist)
-        media_filters = {}
-        for media_type in ['photo', 'video', 'audio', 'voice', 'sticker', 'animation', 'videonote']:
-            try:
-                media_filters[f'antimedia_{media_type}'] = bool(row[f'antimedia_{media_type}'])
-            except (KeyError, IndexError):
-                media_filters[f'antimedia_{media_type}'] = False
-
-        tenants.append(TenantConfig(
-            chat_id=row['chat_id'],
-            chat_title=row['chat_title'] or "",
-            chat_type=row['chat_type'] or "group",
-            welcome_enabled=bool(row['welcome_enabled']),
-            antiflood_enabled=bool(row['antiflood_enabled']),
-            filter_enabled=bool(row['filter_enabled']),
-            verification_enabled=bool(row['verification_enabled']),
-            antilink_enabled=antilink,
-            antifile_enabled=antifile,
-            antimedia_photo=media_filters['antimedia_photo'],
-            antimedia_video=media_filters['antimedia_video'],
-            antimedia_audio=media_filters['antimedia_audio'],
-            antimedia_voice=media_filters['antimedia_voice'],
-            antimedia_sticker=media_filters['antimedia_sticker'],
-            antimedia_animation=media_filters['antimedia_animation'],
-            antimedia_videonote=media_filters['antimedia_videonote'],
-            max_warnings=row['max_warnings'],
-            rules_text=row['rules_text'] or "",
-            language=row['language'] or "en",
-            timezone=row['timezone'] or "UTC",
-            is_active=bool(row['is_active']),
-            delete_join_messages=delete_join,
-            delete_leave_messages=delete_leave,
-            delete_service_messages=delete_service
-        ))
+# ==================== WARNING MANAGEMENT ====================
 
-    conn.close()
-    return tenants
+# Hot-path SQL kept as module constants so the statement cache always sees the same text
+_SQL_GET_WARNINGS = "SELECT warnings FROM tenant_warnings WHERE tenant_id = ? AND user_id = ?"
 
-# ==================== WARNING MANAGEMENT ====================
+_SQL_ADD_WARNING = '''
+    INSERT INTO tenant_warnings (tenant_id, user_id, warnings, last_warning)
+    VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT(tenant_id, user_id) DO UPDATE SET
+        warnings = warnings + 1,
+        last_warning = CURRENT_TIMESTAMP
+'''
+_SQL_ADD_WARNING_RETURNING = _SQL_ADD_WARNING + " RETURNING warnings"
+_SQL_ADD_WARNING_REASON = "INSERT INTO tenant_warning_reasons (tenant_id, user_id, reason) VALUES (?, ?, ?)"
 
 def get_warnings(tenant_id: int, user_id: int) -> int:
     """Get warning count for user in a tenant"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute(
-        "SELECT warnings FROM tenant_warnings WHERE tenant_id = ? AND user_id = ?",
-        (tenant_id, user_id)
-    )
+    cursor.execute(_SQL_GET_WARNINGS, (tenant_id, user_id))
     result = cursor.fetchone()
-    conn.close()
 
     return result['warnings'] if result else 0
 
 def add_warning(tenant_id: int, user_id: int, reason: str = "") -> int:
-    """Add warning to user and return total warnings"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Add warning to user and return total warnings (counter UPSERT + append-only reason row)"""
+    with write_transaction() as cursor:
+        if SQLITE_HAS_RETURNING:
+            cursor.execute(_SQL_ADD_WARNING_RETURNING, (tenant_id, user_id))
+            new_count = cursor.fetchone()[0]
+        else:
+            cursor.execute(_SQL_ADD_WARNING, (tenant_id, user_id))
+            cursor.execute(_SQL_GET_WARNINGS, (tenant_id, user_id))
+            new_count = cursor.fetchone()[0]
 
-    cursor.execute(
-        "SELECT warnings, warning_reasons FROM tenant_warnings WHERE tenant_id = ? AND user_id = ?",
-        (tenant_id, user_id)
-    )
-    result = cursor.fetchone()
-
-    if not result:
-        # Create new warning record
-        cursor.execute('''
-            INSERT INTO tenant_warnings (tenant_id, user_id, warnings, last_warning, warning_reasons)
-            VALUES (?, ?, 1, CURRENT_TIMESTAMP, ?)
-        ''', (tenant_id, user_id, reason))
-        new_count = 1
-    else:
-        # Update existing warnings
-        reasons = result['warning_reasons'] or ""
         if reason:
-            reasons = f"{reasons}\n{datetime.now().isoformat()}: {reason}" if reasons else f"{datetime.now().isoformat()}: {reason}"
+            cursor.execute(_SQL_ADD_WARNING_REASON, (tenant_id, user_id, reason))
 
-        new_count = result['warnings'] + 1
-        cursor.execute('''
-            UPDATE tenant_warnings
-            SET warnings = ?, last_warning = CURRENT_TIMESTAMP, warning_reasons = ?
-            WHERE tenant_id = ? AND user_id = ?
-        ''', (new_count, reasons, tenant_id, user_id))
-
-    conn.commit()
-    conn.close()
     return new_count
 
 def remove_warning(tenant_id: int, user_id: int) -> int:
     """Remove one warning from user and return new count"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT warnings FROM tenant_warnings WHERE tenant_id = ? AND user_id = ?",
-        (tenant_id, user_id)
-    )
-    result = cursor.fetchone()
+    with write_transaction() as cursor:
+        cursor.execute(
+            "SELECT warnings FROM tenant_warnings WHERE tenant_id = ? AND user_id = ?",
+            (tenant_id, user_id)
+        )
+        result = cursor.fetchone()
 
-    if result and result['warnings'] > 0:
-        new_count = result['warnings'] - 1
-        cursor.execute('''
-            UPDATE tenant_warnings
-            SET warnings = ?, last_warning = CURRENT_TIMESTAMP
-            WHERE tenant_id = ? AND user_id = ?
-        ''', (new_count, tenant_id, user_id))
-        conn.commit()
-    else:
-        new_count = 0
+        if result and result['warnings'] > 0:
+            new_count = result['warnings'] - 1
+            cursor.execute('''
+                UPDATE tenant_warnings
+                SET warnings = ?, last_warning = CURRENT_TIMESTAMP
+                WHERE tenant_id = ? AND user_id = ?
+            ''', (new_count, tenant_id, user_id))
+        else:
+            new_count = 0
 
-    conn.close()
     return new_count
 
 def reset_warnings(tenant_id: int, user_id: int):
     """Reset warnings for user"""
+    with write_transaction() as cursor:
+        cursor.execute('''
+            UPDATE tenant_warnings
+            SET warnings = 0, last_warning = NULL
+            WHERE tenant_id = ? AND user_id = ?
+        ''', (tenant_id, user_id))
+        cursor.execute(
+            "DELETE FROM tenant_warning_reasons WHERE tenant_id = ? AND user_id = ?",
+            (tenant_id, user_id)
+        )
+
+def get_warning_reasons(tenant_id: int, user_id: int) -> List[tuple]:
+    """Get (timestamp, reason) pairs for a user's warnings, oldest first"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute('''
-        UPDATE tenant_warnings
-        SET warnings = 0, last_warning = NULL, warning_reasons = NULL
-        WHERE tenant_id = ? AND user_id = ?
-    ''', (tenant_id, user_id))
+    cursor.execute(
+        "SELECT ts, reason FROM tenant_warning_reasons WHERE tenant_id = ? AND user_id = ? ORDER BY id",
+        (tenant_id, user_id)
+    )
 
-    conn.commit()
-    conn.close()
+    return [(row['ts'], row['reason']) for row in cursor.fetchall()]
 
 # ==================== FILTER MANAGEMENT ====================
 
-def get_filter_words(tenant_id: int) -> List[str]:
-    """Get all filtered words for a tenant"""
+# In-process filter word cache: {tenant_id: words}
+# Tuples rather than frozensets so /filters listings keep a stable order
+_filter_cache: Dict[int, Tuple[str, ...]] = {}
+
+def get_filter_words(tenant_id: int) -> Tuple[str, ...]:
+    """Get all filtered words for a tenant (cached until the list changes)"""
+    words = _filter_cache.get(tenant_id)
+    if words is not None:
+        return words
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
     cursor.execute("SELECT word FROM tenant_filters WHERE tenant_id = ?", (tenant_id,))
-    results = cursor.fetchall()
-    conn.close()
+    words = tuple(row['word'] for row in cursor.fetchall())
 
-    return [row['word'] for row in results]
+    _filter_cache[tenant_id] = words
+    return words
 
 def add_filter_word(tenant_id: int, word: str, added_by: int = None) -> bool:
     """Add word to filter list"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute('''
-            INSERT INTO tenant_filters (tenant_id, word, added_by)
-            VALUES (?, ?, ?)
-        ''', (tenant_id, word, added_by))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        # Word already exists
-        conn.close()
-        return False
+    # Duplicates are skipped by the UNIQUE(tenant_id, word) index instead of raising
+    insert = '''
+        INSERT OR IGNORE INTO tenant_filters (tenant_id, word, added_by)
+        VALUES (?, ?, ?)
+    '''
+    params = (tenant_id, word, added_by)
+
+    with write_transaction() as cursor:
+        if SQLITE_HAS_RETURNING:
+            cursor.execute(insert + " RETURNING id", params)
+            added = cursor.fetchone() is not None
+        else:
+            cursor.execute(insert, params)
+            added = cursor.rowcount > 0
+
+    if added:
+        _filter_cache.pop(tenant_id, None)
+    return added
 
 def remove_filter_word(tenant_id: int, word: str) -> bool:
     """Remove word from filter list"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with write_transaction() as cursor:
+        cursor.execute(
+            "DELETE FROM tenant_filters WHERE tenant_id = ? AND word = ?",
+            (tenant_id, word)
+        )
+        deleted = cursor.rowcount > 0
 
-    cursor.execute(
-        "DELETE FROM tenant_filters WHERE tenant_id = ? AND word = ?",
-        (tenant_id, word)
-    )
-    deleted = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    if deleted:
+        _filter_cache.pop(tenant_id, None)
 
     return deleted
 
 # ==================== LOGGING ====================
 
 def log_action(tenant_id: int, user_id: int, admin_id: int, action: str, reason: str = "", duration_minutes: int = None):
-    """Log moderation action"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        INSERT INTO tenant_logs (tenant_id, user_id, admin_id, action, reason, duration_minutes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (tenant_id, user_id, admin_id, action, reason, duration_minutes))
-
-    conn.commit()
-    conn.close()
+    """Log moderation action (queued when the background writer is running)"""
+    queue_write('tenant_logs', (tenant_id, user_id, admin_id, action, reason, duration_minutes))
 
 def get_tenant_stats(tenant_id: int) -> Dict:
-    """Get statistics for a tenant"""
+    """Get statistics for a tenant (one query, one pass over the tenant's logs)"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # Total warnings
-    cursor.execute("SELECT COUNT(*) as count FROM tenant_warnings WHERE tenant_id = ?", (tenant_id,))
-    total_warnings = cursor.fetchone()['count']
-
-    # Total filters
-    cursor.execute("SELECT COUNT(*) as count FROM tenant_filters WHERE tenant_id = ?", (tenant_id,))
-    total_filters = cursor.fetchone()['count']
-
-    # Total actions
-    cursor.execute("SELECT COUNT(*) as count FROM tenant_logs WHERE tenant_id = ?", (tenant_id,))
-    total_actions = cursor.fetchone()['count']
-
-    # Recent actions (last 24h)
-    yesterday = (datetime.now() - timedelta(days=1)).isoformat()
-
-    cursor.execute(
-        "SELECT COUNT(*) as count FROM tenant_logs WHERE tenant_id = ? AND action = 'BAN' AND timestamp > ?",
-        (tenant_id, yesterday)
-    )
-    recent_bans = cursor.fetchone()['count']
-
-    cursor.execute(
-        "SELECT COUNT(*) as count FROM tenant_logs WHERE tenant_id = ? AND action = 'KICK' AND timestamp > ?",
-        (tenant_id, yesterday)
-    )
-    recent_kicks = cursor.fetchone()['count']
-
-    cursor.execute(
-        "SELECT COUNT(*) as count FROM tenant_logs WHERE tenant_id = ? AND action = 'MUTE' AND timestamp > ?",
-        (tenant_id, yesterday)
-    )
-    recent_mutes = cursor.fetchone()['count']
+    # Recent = last 24h, computed by SQLite so it matches CURRENT_TIMESTAMP's UTC format
+    cursor.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM tenant_warnings WHERE tenant_id = :tenant_id) AS total_warnings,
+            (SELECT COUNT(*) FROM tenant_filters WHERE tenant_id = :tenant_id) AS total_filters,
+            COUNT(*) AS total_actions,
+            COUNT(CASE WHEN action = 'BAN' AND timestamp > datetime('now', '-1 day') THEN 1 END) AS recent_bans,
+            COUNT(CASE WHEN action = 'KICK' AND timestamp > datetime('now', '-1 day') THEN 1 END) AS recent_kicks,
+            COUNT(CASE WHEN action = 'MUTE' AND timestamp > datetime('now', '-1 day') THEN 1 END) AS recent_mutes,
+            COUNT(CASE WHEN action = 'WARN' AND timestamp > datetime('now', '-1 day') THEN 1 END) AS recent_warns
+        FROM tenant_logs
+        WHERE tenant_id = :tenant_id
+    ''', {'tenant_id': tenant_id})
+
+    return dict(cursor.fetchone())
 
-    cursor.execute(
-        "SELECT COUNT(*) as count FROM tenant_logs WHERE tenant_id = ? AND action = 'WARN' AND timestamp > ?",
-        (tenant_id, yesterday)
-    )
-    recent_warns = cursor.fetchone()['count']
+# ==================== GLOBAL ADMINS ====================
 
-    conn.close()
+# In-memory copy of global_admins (tiny, rarely changes); kept in sync by add/remove_global_admin
+_global_admins: Optional[set] = None
 
-    return {
-        'total_warnings': total_warnings,
-        'total_filters': total_filters,
-        'total_actions': total_actions,
-        'recent_bans': recent_bans,
-        'recent_kicks': recent_kicks,
-        'recent_mutes': recent_mutes,
-        'recent_warns': recent_warns
-    }
-
-# ==================== GLOBAL ADMINS ====================
+def _load_global_admins(cursor):
+    """Load the global admin IDs into memory"""
+    global _global_admins
+    _global_admins = {row[0] for row in cursor.execute("SELECT user_id FROM global_admins")}
 
 def is_global_admin(user_id: int) -> bool:
     """Check if user is a global admin"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT user_id FROM global_admins WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-
-    return result is not None
+    if _global_admins is None:
+        _load_global_admins(get_db_connection().cursor())
+    return user_id in _global_admins
 
 def log_member_activity(tenant_id: int, user_id: int, action: str):
-    """Log member join/leave activity"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "INSERT INTO member_activity (tenant_id, user_id, action) VALUES (?, ?, ?)",
-        (tenant_id, user_id, action)
-    )
-
-    conn.commit()
-    conn.close()
+    """Log member join/leave activity (queued when the background writer is running)"""
+    queue_write('member_activity', (tenant_id, user_id, action))
 
 def get_member_activity_stats(tenant_id: int) -> dict:
     """Get member join/leave statistics"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # Joined in last 7 days
-    cursor.execute(
-        "SELECT COUNT(*) FROM member_activity WHERE tenant_id = ? AND action = 'joined' AND timestamp > datetime('now', '-7 days')",
-        (tenant_id,)
-    )
-    joined_7d = cursor.fetchone()[0]
-
-    # Left in last 7 days
-    cursor.execute(
-        "SELECT COUNT(*) FROM member_activity WHERE tenant_id = ? AND action = 'left' AND timestamp > datetime('now', '-7 days')",
-        (tenant_id,)
-    )
-    left_7d = cursor.fetchone()[0]
-
-    # Joined in last 30 days
-    cursor.execute(
-        "SELECT COUNT(*) FROM member_activity WHERE tenant_id = ? AND action = 'joined' AND timestamp > datetime('now', '-30 days')",
-        (tenant_id,)
-    )
-    joined_30d = cursor.fetchone()[0]
-
-    # Left in last 30 days
-    cursor.execute(
-        "SELECT COUNT(*) FROM member_activity WHERE tenant_id = ? AND action = 'left' AND timestamp > datetime('now', '-30 days')",
-        (tenant_id,)
-    )
-    left_30d = cursor.fetchone()[0]
-
-    conn.close()
+    # Joined/left in the last 7 and 30 days, in one pass over the last 30 days
+    cursor.execute('''
+        SELECT
+            COUNT(CASE WHEN action = 'joined' AND timestamp > datetime('now', '-7 days') THEN 1 END),
+            COUNT(CASE WHEN action = 'left' AND timestamp > datetime('now', '-7 days') THEN 1 END),
+            COUNT(CASE WHEN action = 'joined' THEN 1 END),
+            COUNT(CASE WHEN action = 'left' THEN 1 END)
+        FROM member_activity
+        WHERE tenant_id = ? AND timestamp > datetime('now', '-30 days')
+    ''', (tenant_id,))
+    joined_7d, left_7d, joined_30d, left_30d = cursor.fetchone()
 
     return {
         'joined_7d': joined_7d,
@@ -707,14 +775,14 @@ def get_member_activity_stats(tenant_id: int) -> dict:
         'net_growth_30d': joined_30d - left_30d
     }
 
+@lru_cache(maxsize=10000)
 def get_user_language(user_id: int) -> str:
-    """Get user's preferred language for private chat"""
+    """Get user's preferred language for private chat (cached, cleared by set_user_language)"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
     cursor.execute("SELECT language FROM user_preferences WHERE user_id = ?", (user_id,))
     result = cursor.fetchone()
-    conn.close()
 
     if result:
         return result[0]
@@ -722,44 +790,38 @@ def get_user_language(user_id: int) -> str:
 
 def set_user_language(user_id: int, language: str):
     """Set user's preferred language for private chat"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        INSERT INTO user_preferences (user_id, language, updated_at)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
-        ON CONFLICT(user_id) DO UPDATE SET
-            language = excluded.language,
-            updated_at = CURRENT_TIMESTAMP
-    ''', (user_id, language))
+    with write_transaction() as cursor:
+        cursor.execute('''
+            INSERT INTO user_preferences (user_id, language, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                language = excluded.language,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (user_id, language))
 
-    conn.commit()
-    conn.close()
+    get_user_language.cache_clear()
 
 def add_global_admin(user_id: int, username: str = ""):
     """Add global admin"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute("INSERT INTO global_admins (user_id, username) VALUES (?, ?)", (user_id, username))
-        conn.commit()
+        with write_transaction() as cursor:
+            cursor.execute("INSERT INTO global_admins (user_id, username) VALUES (?, ?)", (user_id, username))
+        if _global_admins is not None:
+            _global_admins.add(user_id)
         success = True
     except sqlite3.IntegrityError:
         success = False
 
-    conn.close()
     return success
 
 def remove_global_admin(user_id: int):
     """Remove global admin"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with write_transaction() as cursor:
+        cursor.execute("DELETE FROM global_admins WHERE user_id = ?", (user_id,))
+        removed = cursor.rowcount > 0
 
-    cursor.execute("DELETE FROM global_admins WHERE user_id = ?", (user_id,))
-    removed = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    if _global_admins is not None:
+        _global_admins.discard(user_id)
 
     return removed
 
@@ -767,90 +829,307 @@ def remove_global_admin(user_id: int):
 
 def cleanup_old_logs(days: int = 30) -> int:
     """Delete logs older than specified days"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-    cursor.execute("DELETE FROM tenant_logs WHERE timestamp < ?", (cutoff,))
-
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    with write_transaction() as cursor:
+        cursor.execute("DELETE FROM tenant_logs WHERE timestamp < datetime('now', ?)", (f"-{int(days)} days",))
+        deleted = cursor.rowcount
 
     return deleted
 
+def optimize_db():
+    """Refresh query planner statistics and truncate the WAL file (run periodically)"""
+    conn = get_db_connection()
+    conn.execute("PRAGMA optimize")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
 def deactivate_tenant(chat_id: int):
     """Deactivate a tenant (mark as inactive)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with write_transaction() as cursor:
+        cursor.execute("UPDATE tenants SET is_active = 0 WHERE chat_id = ?", (chat_id,))
 
-    cursor.execute("UPDATE tenants SET is_active = 0 WHERE chat_id = ?", (chat_id,))
-    conn.commit()
-    conn.close()
+    invalidate_tenant_config(chat_id)
 
 def delete_tenant_data(chat_id: int):
     """Delete all data for a tenant (WARNING: Cannot be undone!)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM tenant_warnings WHERE tenant_id = ?", (chat_id,))
-    cursor.execute("DELETE FROM tenant_filters WHERE tenant_id = ?", (chat_id,))
-    cursor.execute("DELETE FROM tenant_logs WHERE tenant_id = ?", (chat_id,))
-    cursor.execute("DELETE FROM chat_admins WHERE chat_id = ?", (chat_id,))
-    cursor.execute("DELETE FROM tenants WHERE chat_id = ?", (chat_id,))
-
-    conn.commit()
-    conn.close()
+    # All-or-nothing, with a single commit
+    with write_transaction() as cursor:
+        cursor.execute("DELETE FROM tenant_warnings WHERE tenant_id = ?", (chat_id,))
+        cursor.execute("DELETE FROM tenant_warning_reasons WHERE tenant_id = ?", (chat_id,))
+        cursor.execute("DELETE FROM tenant_filters WHERE tenant_id = ?", (chat_id,))
+        cursor.execute("DELETE FROM tenant_logs WHERE tenant_id = ?", (chat_id,))
+        cursor.execute("DELETE FROM chat_admins WHERE chat_id = ?", (chat_id,))
+        cursor.execute("DELETE FROM tenants WHERE chat_id = ?", (chat_id,))
+
+    invalidate_tenant_config(chat_id)
+    _filter_cache.pop(chat_id, None)
+    with _chat_admins_lock:
+        _get_chat_admins().pop(chat_id, None)
 
 # ==================== CHAT ADMINS CACHE ====================
 
-def update_chat_admin(chat_id: int, user_id: int, status: str):
-    """Update or add a chat admin to the database cache"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        INSERT OR REPLACE INTO chat_admins (chat_id, user_id, status, updated_at)
-        VALUES (?, ?, ?, datetime('now'))
-    ''', (chat_id, user_id, status))
+# chat_admins is derived data (rebuilt from Telegram on demand), so lookups are served from
+# memory: {chat_id: {user_id: status}}. The table is only written behind (via the write
+# queue) so the cache survives restarts.
+_chat_admins: Optional[Dict[int, Dict[int, str]]] = None
+_chat_admins_lock = threading.Lock()
+
+_ADMIN_STATUSES = ('creator', 'administrator')
+
+_SQL_UPDATE_CHAT_ADMIN = '''
+    INSERT OR REPLACE INTO chat_admins (chat_id, user_id, status, updated_at)
+    VALUES (?, ?, ?, datetime('now'))
+'''
+
+def _load_chat_admins(cursor):
+    """Load the persisted chat_admins table into memory"""
+    global _chat_admins
+    admins: Dict[int, Dict[int, str]] = {}
+    for row in cursor.execute("SELECT chat_id, user_id, status FROM chat_admins"):
+        admins.setdefault(row['chat_id'], {})[row['user_id']] = row['status']
+    _chat_admins = admins
+
+def _get_chat_admins() -> Dict[int, Dict[int, str]]:
+    """Return the in-memory chat admins map, loading it on first use"""
+    if _chat_admins is None:
+        _load_chat_admins(get_db_connection().cursor())
+    return _chat_admins
 
-    conn.commit()
-    conn.close()
+def update_chat_admin(chat_id: int, user_id: int, status: str):
+    """Update or add a chat admin to the cache"""
+    with _chat_admins_lock:
+        _get_chat_admins().setdefault(chat_id, {})[user_id] = status
+    queue_write('chat_admins', (chat_id, user_id, status))
+
+def update_chat_admins(rows: List[Tuple[int, int, str]]):
+    """Update or add many (chat_id, user_id, status) admin rows (persisted in one batch)"""
+    if not rows:
+        return
+
+    with _chat_admins_lock:
+        admins = _get_chat_admins()
+        for chat_id, user_id, status in rows:
+            admins.setdefault(chat_id, {})[user_id] = status
+    queue_writes('chat_admins', rows)
 
 def remove_chat_admin(chat_id: int, user_id: int):
     """Remove a user from chat admins cache"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _chat_admins_lock:
+        _get_chat_admins().get(chat_id, {}).pop(user_id, None)
+    queue_write('chat_admins_remove', (chat_id, user_id))
 
-    cursor.execute('DELETE FROM chat_admins WHERE chat_id = ? AND user_id = ?', (chat_id, user_id))
+def get_user_admin_chats(user_id: int) -> List[tuple]:
+    """Get all chats where user is an admin (from cache), ordered by title"""
+    with _chat_admins_lock:
+        chat_ids = [
+            chat_id for chat_id, admins in _get_chat_admins().items()
+            if admins.get(user_id) in _ADMIN_STATUSES
+        ]
+    if not chat_ids:
+        return []
+
+    # Titles come from the tenant cache; only tenants not cached yet hit the database
+    titles = {}
+    missing = []
+    for chat_id in chat_ids:
+        tenant = get_cached_tenant_config(chat_id)
+        if tenant is not None:
+            titles[chat_id] = tenant.chat_title
+        else:
+            missing.append(chat_id)
+
+    if missing:
+        cursor = get_db_connection().cursor()
+        cursor.execute(
+            f"SELECT chat_id, chat_title FROM tenants WHERE chat_id IN ({','.join('?' * len(missing))})",
+            missing
+        )
+        titles.update((row['chat_id'], row['chat_title']) for row in cursor.fetchall())
 
-    conn.commit()
-    conn.close()
+    # Only chats with a tenant row, sorted like ORDER BY chat_title (NULLs first)
+    chats = [(chat_id, titles[chat_id]) for chat_id in chat_ids if chat_id in titles]
+    chats.sort(key=lambda chat: (chat[1] is not None, chat[1] or ""))
+    return chats
 
-def get_user_admin_chats(user_id: int) -> List[tuple]:
-    """Get all chats where user is an admin (from cache)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def refresh_chat_admins(chat_id: int):
+    """Clear all admins for a chat (to force refresh from Telegram API)"""
+    with _chat_admins_lock:
+        _get_chat_admins().pop(chat_id, None)
+    queue_write('chat_admins_clear', (chat_id,))
+
+# ==================== ASYNC ACCESS ====================
+
+# sqlite3 calls block, so handlers run them on a small dedicated pool instead of
+# the event loop. WAL lets the readers proceed in parallel; writers still serialize.
+DB_POOL_SIZE = 4
+_db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
+# Writes go through one dedicated thread: SQLite allows a single writer anyway, so
+# queuing them here avoids busy_timeout waits and keeps the reader threads free
+_db_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the database thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(func, *args, **kwargs))
+
+async def run_db_write(func, *args, **kwargs):
+    """Run a blocking database write on the single writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_write_executor, partial(func, *args, **kwargs))
+
+def _async_reader(func):
+    """Build an async variant of a read helper (runs on the reader pool)"""
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    wrapper.__name__ = wrapper.__qualname__ = f"a{func.__name__}"
+    wrapper.__doc__ = f"Async {func.__name__} (runs on the database thread pool)"
+    return wrapper
+
+def _async_writer(func):
+    """Build an async variant of a write helper (runs on the writer thread)"""
+    async def wrapper(*args, **kwargs):
+        return await run_db_write(func, *args, **kwargs)
+    wrapper.__name__ = wrapper.__qualname__ = f"a{func.__name__}"
+    wrapper.__doc__ = f"Async {func.__name__} (runs on the database writer thread)"
+    return wrapper
+
+# Async API for handlers; the sync functions above stay for scripts and legacy callers
+aget_tenant_stats = _async_reader(get_tenant_stats)
+aget_member_activity_stats = _async_reader(get_member_activity_stats)
+
+aadd_warning = _async_writer(add_warning)
+areset_warnings = _async_writer(reset_warnings)
+aupdate_tenant_config = _async_writer(update_tenant_config)
+
+async def aget_or_create_tenant(chat_id: int, chat_title: str = "", chat_type: str = "group") -> TenantConfig:
+    """Async get_or_create_tenant: the lookup runs on the reader pool, creating a tenant on the writer thread"""
+    config = await run_db(get_tenant, chat_id)
+    if config is None:
+        config = await run_db_write(get_or_create_tenant, chat_id, chat_title, chat_type)
+    return config
 
-    cursor.execute('''
-        SELECT ca.chat_id, t.chat_title
-        FROM chat_admins ca
-        JOIN tenants t ON ca.chat_id = t.chat_id
-        WHERE ca.user_id = ? AND ca.status IN ('creator', 'administrator')
-        ORDER BY t.chat_title
-    ''', (user_id,))
+# ==================== BACKGROUND WRITE QUEUE ====================
+
+# Small writes that can be batched: {kind: statement}
+_WRITE_SQL = {
+    'tenant_logs': '''
+        INSERT INTO tenant_logs (tenant_id, user_id, admin_id, action, reason, duration_minutes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+    'member_activity': "INSERT INTO member_activity (tenant_id, user_id, action) VALUES (?, ?, ?)",
+    'chat_admins': _SQL_UPDATE_CHAT_ADMIN,
+    'chat_admins_remove': "DELETE FROM chat_admins WHERE chat_id = ? AND user_id = ?",
+    'chat_admins_clear': "DELETE FROM chat_admins WHERE chat_id = ?",
+}
+
+WRITE_BATCH_SIZE = 500  # rows per transaction
+WRITE_FLUSH_DELAY = 0.05  # seconds to wait for more rows before committing
+
+# Created by start_write_queue() inside the running event loop
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+_write_loop: Optional[asyncio.AbstractEventLoop] = None
+_write_loop_thread: Optional[int] = None
+
+def _flush_writes(batch: List[tuple]):
+    """Write a batch of queued rows in a single transaction, in queue order"""
+    with write_transaction() as cursor:
+        # Consecutive rows of the same kind share one executemany; order across kinds is kept
+        for kind, entries in groupby(batch, key=itemgetter(0)):
+            cursor.executemany(_WRITE_SQL[kind], [row for _, row in entries])
+
+def queue_write(kind: str, row: tuple):
+    """Queue a write for the background writer, or write it now if no writer is running"""
+    if _write_queue is None:
+        _flush_writes([(kind, row)])
+    elif threading.get_ident() == _write_loop_thread:
+        _write_queue.put_nowait((kind, row))
+    else:
+        # Called from a database worker thread: asyncio.Queue is not thread-safe
+        _write_loop.call_soon_threadsafe(_put_write, (kind, row))
 
-    results = cursor.fetchall()
-    conn.close()
+def _put_write(item: tuple):
+    """Queue a row handed over from another thread (runs on the event loop)"""
+    if _write_queue is not None:
+        _write_queue.put_nowait(item)
+    else:
+        # The writer stopped after this row was handed over: write it on the writer thread
+        _db_write_executor.submit(_flush_late_write, item)
 
-    return [(row['chat_id'], row['chat_title']) for row in results]
+def _flush_late_write(item: tuple):
+    """Write a row that arrived after the background writer stopped"""
+    try:
+        _flush_writes([item])
+    except Exception:
+        logger.exception("Error writing a row queued after the writer stopped")
+
+def queue_writes(kind: str, rows: List[tuple]):
+    """Queue several writes of one kind (written together if no writer is running)"""
+    if _write_queue is None:
+        _flush_writes([(kind, row) for row in rows])
+    else:
+        for row in rows:
+            queue_write(kind, row)
+
+# Queued by stop_write_queue(): the worker flushes what it holds and exits when it sees it
+_STOP_WRITER = object()
+
+async def _write_queue_worker():
+    """Drain the write queue, committing up to WRITE_BATCH_SIZE rows per transaction"""
+    while True:
+        item = await _write_queue.get()
+        if item is _STOP_WRITER:
+            return
+        batch = [item]
+        stopping = False
+
+        # Give a burst (flood, raid) a moment to pile up so it shares one commit
+        await asyncio.sleep(WRITE_FLUSH_DELAY)
+        while len(batch) < WRITE_BATCH_SIZE and not _write_queue.empty():
+            item = _write_queue.get_nowait()
+            if item is _STOP_WRITER:
+                stopping = True
+                break
+            batch.append(item)
+
+        # Any error drops this batch only; the worker must keep running or the queue grows forever
+        try:
+            await run_db_write(_flush_writes, batch)
+        except Exception:
+            logger.exception(f"Error flushing {len(batch)} queued writes")
 
-def refresh_chat_admins(chat_id: int):
-    """Clear all admins for a chat (to force refresh from Telegram API)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+        if stopping:
+            return
 
-    cursor.execute('DELETE FROM chat_admins WHERE chat_id = ?', (chat_id,))
+def start_write_queue():
+    """Start the background writer (must be called from the running event loop)"""
+    global _write_queue, _writer_task, _write_loop, _write_loop_thread
 
-    conn.commit()
-    conn.close()
+    if _writer_task is not None:
+        return
+
+    _write_loop = asyncio.get_running_loop()
+    _write_loop_thread = threading.get_ident()
+    _write_queue = asyncio.Queue()
+    _writer_task = asyncio.create_task(_write_queue_worker())
+
+async def stop_write_queue():
+    """Stop the background writer and flush anything still queued"""
+    global _write_queue, _writer_task
+
+    if _writer_task is None:
+        return
+
+    # Let the worker finish (and flush) the batch it may already hold instead of cancelling it
+    _write_queue.put_nowait(_STOP_WRITER)
+    await _writer_task
+
+    # Rows handed over from worker threads after the stop marker
+    pending = []
+    while not _write_queue.empty():
+        pending.append(_write_queue.get_nowait())
+
+    _write_queue = None
+    _writer_task = None
+
+    if pending:
+        await run_db_write(_flush_writes, pending)
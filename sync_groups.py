@@ -2,12 +2,12 @@
 """Sync accessible groups to database"""
 
 import asyncio
-from telegram import Bot
-from config import Config
-from database import get_or_create_tenant
+import sys
+from bot_client import get_bot, install_uvloop
+from database import bulk_upsert_tenants
 
-# Group IDs that the bot can access
-GROUP_IDS = [
+# Group IDs that the bot can access (immutable config: tuple, plus a set for membership checks)
+GROUP_IDS = (
     -1003175985458,  # 💞ailem NAZARBEK FILIAL
     -1003147939740,  # 💞ailem SERGELI FILIAL
     -1002989401855,  # 💋𝗝𝗼𝘇𝗶𝗯𝗮𝗹𝗶_𝗣𝗲𝗻𝘂𝗮𝗿𝗹𝗮𝗿💋
@@ -25,34 +25,56 @@ GROUP_IDS = [
     -1001417119670,  # 𝙋𝙊𝙎𝙏𝙀𝙇 𝙎𝙆𝙇𝘼𝘿 𝘾𝙃𝘼𝙏
     -1001279832948,  # Бепул ХИТОЙ тили
     -4759367262,     # Ali & Шерзодбек Балтабаев
-]
+)
+GROUP_IDS_SET = frozenset(GROUP_IDS)
 
-async def main():
-    bot = Bot(token=Config.BOT_TOKEN)
+# At most this many get_chat calls in flight (keeps well under Telegram's rate limits)
+MAX_CONCURRENT_REQUESTS = 8
+
+async def fetch_one(bot, group_id, semaphore):
+    """Fetch one group's chat info"""
+    async with semaphore:
+        return await bot.get_chat(group_id)
 
+async def main():
     print("🔄 Syncing groups to database...\n")
 
     added = 0
     skipped = 0
 
-    for group_id in GROUP_IDS:
-        try:
-            chat = await bot.get_chat(group_id)
+    # Shared pooled client: every get_chat reuses its keep-alive connections, and the
+    # context manager initializes it up front and closes them cleanly afterwards
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    async with get_bot() as bot:
+        results = await asyncio.gather(
+            *(fetch_one(bot, group_id, semaphore) for group_id in GROUP_IDS),
+            return_exceptions=True
+        )
 
-            # Get or create tenant - this will add to database if not exists
-            tenant = get_or_create_tenant(group_id, chat.title, chat.type)
-
-            print(f"✅ {chat.title}")
+    # Collect per-group lines and write them in one go
+    chats = []
+    lines = []
+    for group_id, result in zip(GROUP_IDS, results):
+        if isinstance(result, Exception):
+            lines.append(f"❌ ID: {group_id} - {str(result)[:50]}\n")
+            skipped += 1
+        else:
+            lines.append(f"✅ {result.title}\n")
+            chats.append(result)
             added += 1
+    sys.stdout.write("".join(lines))
+    sys.stdout.flush()
 
-        except Exception as e:
-            print(f"❌ ID: {group_id} - {str(e)[:50]}")
-            skipped += 1
+    # Add new groups and refresh titles of known ones in a single transaction
+    bulk_upsert_tenants([(chat.id, chat.title, chat.type) for chat in chats])
 
-    print(f"\n📊 Summary:")
-    print(f"   Added/Verified: {added}")
-    print(f"   Skipped: {skipped}")
-    print(f"\n✅ Database sync complete!")
+    print(
+        f"\n📊 Summary:\n"
+        f"   Added/Verified: {added}\n"
+        f"   Skipped: {skipped}\n"
+        f"\n✅ Database sync complete!"
+    )
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
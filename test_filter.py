@@ -4,14 +4,23 @@
 import sys
 sys.path.insert(0, '/root/qaynona-bot')
 
-from bot import application
+from collections import defaultdict
+
+from bot import build_application
+
+application = build_application()
 
 print("Checking registered handlers...\n")
 
-# Check if MessageHandler for filter_messages exists
+# One pass over all handlers: print them and index by callback name
+by_callback = defaultdict(list)
 for group_number, handlers in application.handlers.items():
     print(f"Group {group_number}:")
     for handler in handlers:
+        callback = getattr(handler, 'callback', None)
+        if callback is not None:
+            by_callback[callback.__name__].append((group_number, handler))
+
         handler_type = type(handler).__name__
         if handler_type == "MessageHandler":
             print(f"  - MessageHandler (filters: {handler.filters})")
@@ -20,13 +29,10 @@ for group_number, handlers in application.handlers.items():
     print()
 
 print("\nLooking for filter_messages handler...")
-found = False
-for group_number, handlers in application.handlers.items():
-    for handler in handlers:
-        if hasattr(handler, 'callback') and handler.callback.__name__ == 'filter_messages':
-            print(f"✅ Found filter_messages in group {group_number}")
-            print(f"   Filters: {handler.filters}")
-            found = True
+found = by_callback.get('filter_messages', [])
+for group_number, handler in found:
+    print(f"✅ Found filter_messages in group {group_number}")
+    print(f"   Filters: {handler.filters}")
 
 if not found:
     print("❌ filter_messages handler NOT found!")
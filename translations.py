@@ -3,6 +3,15 @@ Language translations for the bot
 Supports: Uzbek (uz) only
 """
 
+from string import Formatter
+from typing import Dict, Optional
+
+# Shared skeleton for the link/file/media warnings ({what} is filled in per key below)
+_WARN_TEMPLATE = '⚠️ {user} guruhga {what} yuborgani uchun {warnings} chi martta ogohlantirildi\n\n💡 Agar {max_warnings} ta ogohlantirish olsangiz, guruhdan chiqarilasiz.'
+
+# Identical text for both "no admin groups" keys (one string object)
+_NO_ADMIN_GROUPS = '❌ Siz men boshqaradigan guruhlarda administrator emassiz.\n\nMeni guruhga qo\'shing va o\'zingizni admin qiling.'
+
 TRANSLATIONS = {
     'uz': {
         # Start menu
@@ -119,8 +128,8 @@ TRANSLATIONS = {
         'back_to_menu': '◀️ Oldingi menyuga qaytish',
         'settings_private_button': '⚙️ Sozlamalarni shaxsiy ochish',
         'settings_private_msg': '🔒 Guruh chatini toza saqlash uchun, sozlamalar endi shaxsiy chatda boshqariladi.\n\nSozlamalarni ochish uchun quyidagi tugmani bosing:',
-        'no_admin_groups': '❌ Siz men boshqaradigan guruhlarda administrator emassiz.\n\nMeni guruhga qo\'shing va o\'zingizni admin qiling.',
-        'no_admin_groups_add': '❌ Siz men boshqaradigan guruhlarda administrator emassiz.\n\nMeni guruhga qo\'shing va o\'zingizni admin qiling.',
+        'no_admin_groups': _NO_ADMIN_GROUPS,
+        'no_admin_groups_add': _NO_ADMIN_GROUPS,
 
         # Info command
         'info_title': '👤 Foydalanuvchi Ma\'lumoti',
@@ -129,6 +138,7 @@ TRANSLATIONS = {
         'info_username': 'Foydalanuvchi nomi',
         'info_status': 'Holat',
         'info_warnings': 'Ogohlantirishlar',
+        'warning_reasons': 'Sabablar',
         'info_is_bot': 'Bot',
         'info_tenant_id': 'Guruh ID',
         'info_yes': 'Ha',
@@ -293,13 +303,13 @@ Foydalanuvchi chetlatilishidan oldin nechta ogohlantirish berishni belgilaydi.''
         'verify_kicked': '❌ {user} guruhdan chiqarildi (tasdiqlanmadi)',
 
         # Link filtering
-        'link_warning': '⚠️ {user} guruhga havola yuborgani uchun {warnings} chi martta ogohlantirildi\n\n💡 Agar {max_warnings} ta ogohlantirish olsangiz, guruhdan chiqarilasiz.',
+        'link_warning': _WARN_TEMPLATE.replace('{what}', 'havola'),
 
         # File filtering
-        'file_warning': '⚠️ {user} guruhga fayl yuborgani uchun {warnings} chi martta ogohlantirildi\n\n💡 Agar {max_warnings} ta ogohlantirish olsangiz, guruhdan chiqarilasiz.',
+        'file_warning': _WARN_TEMPLATE.replace('{what}', 'fayl'),
 
         # Media filtering
-        'media_warning': '⚠️ {user} guruhga {media_type} yuborgani uchun {warnings} chi martta ogohlantirildi\n\n💡 Agar {max_warnings} ta ogohlantirish olsangiz, guruhdan chiqarilasiz.',
+        'media_warning': _WARN_TEMPLATE.replace('{what}', '{media_type}'),
         'media_photo_name': 'rasm',
         'media_video_name': 'video',
         'media_audio_name': 'audio',
@@ -321,18 +331,47 @@ LANGUAGE_NAMES = {
     'uz': '🇺🇿 O\'zbekcha'
 }
 
-def get_text(lang: str, key: str, **kwargs) -> str:
-    """Get translated text for a given language and key"""
-    # Always use Uzbek since it's the only language
-    lang = 'uz'
-
-    text = TRANSLATIONS.get(lang, {}).get(key, key)
+# Uzbek is the only language, so the table is bound once and lookups skip the language level
+_UZ: Dict[str, str] = TRANSLATIONS['uz']
 
-    # Format with kwargs if provided
-    if kwargs:
-        try:
-            text = text.format(**kwargs)
-        except KeyError:
-            pass
+def get_texts(lang: str) -> Dict[str, str]:
+    """Get the whole translation table for a language (for hot paths that format directly)"""
+    # Always use Uzbek since it's the only language
+    return _UZ
+
+def _compile_template(template: str) -> Optional[str]:
+    """Translate a str.format template into an equivalent printf-style one (None if it can't be)"""
+    parts = []
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        parts.append(literal.replace('%', '%%'))
+        if field_name is None:
+            continue
+        if format_spec or conversion or not field_name.isidentifier():
+            return None
+        parts.append(f"%({field_name})s")
+    return ''.join(parts)
+
+# Templates pre-parsed on first use: printf-style "%(name)s" formatting skips str.format's
+# per-call template parsing. Keys whose fields need more than plain {name} map to None and
+# stay on format_map. Filled lazily so importing the module doesn't parse every template.
+_COMPILED: Dict[str, Optional[str]] = {}
+_NOT_COMPILED = object()
+
+# Bound once: the zero-kwargs path is a single C-level dict lookup (faster than an lru_cache hit)
+_lookup = _UZ.get
 
-    return text
+def get_text(lang: str, key: str, **kwargs) -> str:
+    """Get translated text for a given language and key (lang is kept for API compatibility)"""
+    text = _lookup(key, key)
+    # Untemplated text (or a stray kwarg) needs no formatting at all
+    if not kwargs or '{' not in text:
+        return text
+
+    # Format with kwargs
+    compiled = _COMPILED.get(key, _NOT_COMPILED)
+    if compiled is _NOT_COMPILED:
+        compiled = _COMPILED[key] = _compile_template(text)
+    try:
+        return compiled % kwargs if compiled is not None else text.format_map(kwargs)
+    except KeyError:
+        return text